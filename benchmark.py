@@ -0,0 +1,422 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+import crop_screenshot
+import fingerprint_index
+import main as pipeline
+import title_templates
+
+# ------------------- Configuration -------------------
+SAMPLES = 200             # Synthetic screenshots per run
+SEED = 0
+FONT_PATH = None          # Font for the tooltip text; None uses the title template fonts
+FONT_SCALE = 1.0          # Text size relative to BASE_FONT_SIZE
+NOISE = 8.0               # Standard deviation of the Gaussian noise added to every pixel
+TYPO_RATE = 0.05          # Per-character chance of an OCR-style error in the matching inputs
+EXCEL_ROWS = 10000        # Inventory rows in the generated report
+EXCEL_REPEATS = 5
+ROUNDS = 3                # Each stage runs this many times and its fastest round counts
+
+BASELINE_PATH = os.path.join('output', 'benchmark_baseline.json')
+REGRESSION_THRESHOLD = 0.2  # A stage regresses when its throughput drops by more than this fraction
+
+STAGES = ('crop_sections', 'preprocess_image', 'ocr', 'find_best_item_match', 'find_best_trait_match', 'generate_excel')
+
+# Synthetic tooltip layout: the structural templates are pasted into a capture-sized frame
+# and the text is drawn where the title and trait crops pick it up
+SCREENSHOT_WIDTH = 600    # capture.py's base capture size
+SCREENSHOT_HEIGHT = 1000
+BASE_FONT_SIZE = 24
+TEXT_INSET = 10                    # Left margin of the text inside each section
+TITLE_TEXT_OFFSET = 32             # Item name baseline area, below the top of the title bar
+TRAIT_TEXT_OFFSET = 36             # Trait name, below the top of the 'Trait' header
+BACKGROUND_COLOR = (10, 14, 24)    # RGB
+TRAIT_TEXT_COLOR = (230, 230, 230)
+RARITY_TEXT_COLORS = [(0, 112, 221), (163, 53, 238), (255, 255, 255)]  # Rare, Epic, Common
+
+# -----------------------------------------------------
+
+
+# ------------------- Synthetic Tooltips -------------------
+def load_font(font_path, scale):
+    size = max(6, round(BASE_FONT_SIZE * scale))
+    for path in [font_path] if font_path else title_templates.TITLE_FONT_PATHS:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    logging.error("No font found for the synthetic tooltips, using PIL's default font.")
+    return ImageFont.load_default(size)
+
+
+def load_color_templates(templates_folder=crop_screenshot.TEMPLATES_FOLDER):
+    templates = [cv2.imread(os.path.join(templates_folder, name), cv2.IMREAD_COLOR)
+                 for name in ('title_template.png', 'trait_template.png')]
+    return (None, None) if any(template is None for template in templates) else tuple(templates)
+
+
+def render_tooltip(item_name, trait, font, title_template, trait_template, rng, noise, title_color=None):
+    """
+    Render a BGR screenshot of a tooltip showing item_name and trait, with the structural
+    templates at random positions and Gaussian noise on top. The title is drawn in a random
+    rarity colour unless title_color is given.
+    """
+    screenshot = np.zeros((SCREENSHOT_HEIGHT, SCREENSHOT_WIDTH, 3), np.uint8)
+    screenshot[:] = BACKGROUND_COLOR[::-1]
+    title_height, title_width = title_template.shape[:2]
+    trait_height, trait_width = trait_template.shape[:2]
+    title_x = int(rng.integers(0, SCREENSHOT_WIDTH - max(title_width, crop_screenshot.TITLE_EXPAND_WIDTH) + 1))
+    title_y = int(rng.integers(0, SCREENSHOT_HEIGHT // 3))
+    trait_x = int(rng.integers(0, SCREENSHOT_WIDTH - max(trait_width, crop_screenshot.TRAIT_EXPAND_WIDTH) + 1))
+    trait_y = title_y + crop_screenshot.TITLE_EXPAND_HEIGHT + int(rng.integers(0, SCREENSHOT_HEIGHT // 3))
+    screenshot[title_y:title_y + title_height, title_x:title_x + title_width] = title_template
+    screenshot[trait_y:trait_y + trait_height, trait_x:trait_x + trait_width] = trait_template
+
+    image = Image.fromarray(cv2.cvtColor(screenshot, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(image)
+    random_color = RARITY_TEXT_COLORS[int(rng.integers(len(RARITY_TEXT_COLORS)))]
+    title_color = title_color or random_color
+    draw.text((title_x + TEXT_INSET, title_y + TITLE_TEXT_OFFSET), item_name, fill=title_color, font=font)
+    draw.text((trait_x + TEXT_INSET, trait_y + TRAIT_TEXT_OFFSET), trait, fill=TRAIT_TEXT_COLOR, font=font)
+    screenshot = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+
+    if noise > 0:
+        noisy = screenshot.astype(np.float32) + rng.normal(0, noise, screenshot.shape).astype(np.float32)
+        screenshot = np.clip(noisy, 0, 255).astype(np.uint8)
+    return screenshot
+
+
+def add_typos(text, rate, rng):
+    # Substitute, drop or double characters the way OCR misreads do
+    characters = []
+    for character in text:
+        roll = rng.random()
+        if roll < rate / 3:
+            characters.append(rng.choice('abcdefghijklmnopqrstuvwxyz'))
+        elif roll < 2 * rate / 3:
+            continue
+        elif roll < rate:
+            characters.append(character * 2)
+        else:
+            characters.append(character)
+    return ''.join(characters)
+
+
+def build_samples(folder, samples, seed, font_path, scale, noise):
+    """
+    Write the synthetic screenshots to folder. Returns [(path, item_name, trait), ...].
+    """
+    pipeline.ensure_catalogs()
+    title_template, trait_template = load_color_templates()
+    if title_template is None:
+        raise FileNotFoundError(f"Structural templates not found in '{crop_screenshot.TEMPLATES_FOLDER}'")
+    font = load_font(font_path, scale)
+    rng = np.random.default_rng(seed)
+    choose = random.Random(seed)
+    result = []
+    for index in range(samples):
+        item_name, trait = choose.choice(pipeline.item_names), choose.choice(pipeline.traits)
+        path = os.path.join(folder, f'sample_{index:05d}.png')
+        cv2.imwrite(path, render_tooltip(item_name, trait, font, title_template, trait_template, rng, noise))
+        result.append((path, item_name, trait))
+    return result
+# ---------------------------------------------------------
+
+
+def title_fingerprint(screenshot, structural_templates):
+    crops = crop_screenshot.crop_image(screenshot, *structural_templates, log_rejections=False)
+    processed = pipeline.preprocess_image(crops[0]) if crops is not None else None
+    return fingerprint_index.perceptual_hash(processed) if processed is not None else None
+
+
+def measure_fingerprints(font_path, scale, samples, seed, noise, work_folder):
+    """
+    Fingerprint every catalog name, rendered noise-free in each rarity colour through the
+    cropping and preprocessing stages, and find the two different names that came out
+    closest. Then look up samples noisy tooltips at random positions in an index of those
+    fingerprints. Returns {'closest': (distance, name, other name) or None,
+    'correct'/'wrong'/'missed': fractions of the lookups, 'lookups': count}.
+    """
+    pipeline.ensure_catalogs()
+    title_template, trait_template = load_color_templates()
+    if title_template is None:
+        raise FileNotFoundError(f"Structural templates not found in '{crop_screenshot.TEMPLATES_FOLDER}'")
+    structural_templates = crop_screenshot.load_templates()
+    font = load_font(font_path, scale)
+    fingerprints = {}
+    for item_name in dict.fromkeys(pipeline.item_names):
+        for color in RARITY_TEXT_COLORS:
+            # The same seed puts every tooltip at the same position
+            screenshot = render_tooltip(item_name, '', font, title_template, trait_template,
+                                        np.random.default_rng(SEED), 0, title_color=color)
+            fingerprint = title_fingerprint(screenshot, structural_templates)
+            if fingerprint is not None:
+                fingerprints.setdefault(item_name, []).append(fingerprint)
+
+    index = fingerprint_index.FingerprintIndex(os.path.join(work_folder, 'fingerprints.sqlite'))
+    for item_name, values in fingerprints.items():
+        for value in values:
+            index.add('title', value, item_name)
+    rng = np.random.default_rng(seed)
+    choose = random.Random(seed)
+    outcomes = Counter()
+    for _ in range(samples):
+        item_name = choose.choice(list(fingerprints))
+        screenshot = render_tooltip(item_name, '', font, title_template, trait_template, rng, noise)
+        fingerprint = title_fingerprint(screenshot, structural_templates)
+        name = index.lookup('title', fingerprint) if fingerprint is not None else None
+        outcomes['missed' if name is None else 'correct' if name == item_name else 'wrong'] += 1
+    lookups = sum(outcomes.values())
+    result = {outcome: outcomes[outcome] / max(1, lookups) for outcome in ('correct', 'wrong', 'missed')}
+    result.update(closest=fingerprint_index.closest_names(fingerprints), lookups=lookups)
+    return result
+# ---------------------------------------------------------
+
+
+# ------------------- Measurement -------------------
+def time_calls(func, inputs, rounds=1, setup=None):
+    """
+    Call func on every input, rounds times over, and return (latencies in seconds, results)
+    of the fastest round, one per input. setup() runs before each round, outside the timing.
+    """
+    best = None
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        latencies, results = [], []
+        for item in inputs:
+            start = time.perf_counter()
+            results.append(func(item))
+            latencies.append(time.perf_counter() - start)
+        if best is None or sum(latencies) < sum(best[0]):
+            best = latencies, results
+    return best
+
+
+def summarize(latencies, items_per_call=1, succeeded=None):
+    total = sum(latencies)
+    summary = {
+        'calls': len(latencies),
+        'per_second': items_per_call * len(latencies) / total if total > 0 else 0.0,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+    }
+    if succeeded is not None:
+        summary['success_rate'] = succeeded / len(latencies)
+    return summary
+
+
+def available_ocr_backends():
+    backends = []
+    if importlib.util.find_spec('pytesseract') and shutil.which(pipeline.TESSERACT_CMD):
+        backends.append('pytesseract')
+    if importlib.util.find_spec('tesserocr'):
+        backends.append('tesserocr')
+    if importlib.util.find_spec('easyocr'):
+        backends.append('easyocr')
+    return backends
+
+
+def ocr_function(backend):
+    if backend == 'easyocr':
+        return pipeline.extract_text_with_easyocr_func
+    pipeline.TESSERACT_BACKEND = backend
+    return pipeline.extract_text_with_tesseract
+
+
+def benchmark_stages(samples, stages, typo_rate, seed, excel_rows, excel_repeats, work_folder, rounds=ROUNDS):
+    """
+    Time every requested stage separately. Returns {stage name: summary}.
+    """
+    results = {}
+    title_template, trait_template = crop_screenshot.load_templates(crop_screenshot.TEMPLATES_FOLDER)
+    latencies, crops = time_calls(lambda path: crop_screenshot.crop_sections(path, title_template, trait_template),
+                                  [path for path, _, _ in samples], rounds)
+    if 'crop_sections' in stages:
+        results['crop_sections'] = summarize(latencies, succeeded=sum(crop is not None for crop in crops))
+    crop_images = [image for crop in crops if crop is not None for image in crop]
+    # Each crop's type, so the OCR stages use the title and trait preprocessing and config as real runs do
+    crop_types = [image_type for crop in crops if crop is not None for image_type in ('title', 'trait')]
+
+    if 'preprocess_image' in stages and crop_images:
+        latencies, _ = time_calls(pipeline.preprocess_image, crop_images, rounds)
+        results['preprocess_image'] = summarize(latencies)
+
+    if 'ocr' in stages and crop_images:
+        backends = available_ocr_backends()
+        if not backends:
+            logging.error("No OCR backend available; skipping the OCR stages.")
+        pipeline.OCR_CACHE_PATH = None
+        for backend in backends:
+            extract = ocr_function(backend)
+            extract(crop_images[0], crop_types[0])  # Load the engine outside the timing
+            latencies, _ = time_calls(lambda task: extract(*task), list(zip(crop_images, crop_types)), rounds)
+            results[f'ocr_{backend}'] = summarize(latencies)
+
+    rng = random.Random(seed)
+    if 'find_best_item_match' in stages:
+        names = [item_name for _, item_name, _ in samples]
+        latencies, matches = time_calls(pipeline.find_best_item_match,
+                                        [add_typos(name, typo_rate, rng) for name in names],
+                                        rounds, pipeline.match_item_text.cache_clear)
+        results['find_best_item_match'] = summarize(
+            latencies, succeeded=sum(match[0] == name for match, name in zip(matches, names)))
+    if 'find_best_trait_match' in stages:
+        traits = [trait for _, _, trait in samples]
+        texts = [pipeline.process_trait_text(add_typos(f'Trait {trait}', typo_rate, rng)) for trait in traits]
+        latencies, matches = time_calls(pipeline.find_best_trait_match, texts, rounds, pipeline.match_trait_text.cache_clear)
+        results['find_best_trait_match'] = summarize(
+            latencies, succeeded=sum(match == trait for match, trait in zip(matches, traits)))
+
+    if 'generate_excel' in stages:
+        results['generate_excel'] = benchmark_excel(excel_rows, excel_repeats, seed, work_folder)
+    return results
+
+
+def benchmark_excel(rows, repeats, seed, work_folder):
+    import pandas as pd
+    import generate_excel
+
+    rng = random.Random(seed)
+    items = [rng.choice(pipeline.item_names) for _ in range(rows)]
+    pd.DataFrame({
+        'File': [f'sample_{index:05d}' for index in range(rows)],
+        'Matched Items': items,
+        'Type': [pipeline.known_items[item]['Type'] for item in items],
+        'Rarity': [rng.choice(['Rare', 'Epic', 'Unknown']) for _ in range(rows)],
+        'Matched Traits': [rng.choice(pipeline.traits) for _ in range(rows)],
+    }).to_csv(os.path.join(work_folder, 'inventory.csv'), index=False)
+    generate_excel.INPUT_CSV = os.path.join(work_folder, 'inventory.csv')
+    generate_excel.INPUT_PARQUET = os.path.join(work_folder, 'missing.parquet')
+    generate_excel.INPUT_DB = None
+    generate_excel.OUTPUT_EXCEL = os.path.join(work_folder, 'report.xlsx')
+    latencies, _ = time_calls(lambda _: generate_excel.generate_excel(), range(repeats))
+    return summarize(latencies, items_per_call=rows)
+# ---------------------------------------------------------
+
+
+# ------------------- Baseline -------------------
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, report):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Saved benchmark baseline to {path}")
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Return {stage: relative throughput change} and the stages slower than the threshold allows.
+    """
+    changes, regressions = {}, []
+    for stage, summary in results.items():
+        base = baseline['stages'].get(stage)
+        if not base or not base['per_second']:
+            continue
+        changes[stage] = summary['per_second'] / base['per_second'] - 1
+        if changes[stage] < -threshold:
+            regressions.append(stage)
+    return changes, regressions
+
+
+def print_report(results, changes):
+    print(f"{'stage':<24}{'calls':>7}{'items/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'success':>9}{'vs baseline':>13}")
+    for stage, summary in results.items():
+        success = f"{summary['success_rate']:.0%}" if 'success_rate' in summary else ''
+        change = f"{changes[stage]:+.1%}" if stage in changes else ''
+        print(f"{stage:<24}{summary['calls']:>7}{summary['per_second']:>12.1f}"
+              f"{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}{success:>9}{change:>13}")
+# ---------------------------------------------------------
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic tooltips.")
+    parser.add_argument('--samples', type=int, default=SAMPLES, help="Number of synthetic screenshots")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--font', default=FONT_PATH, help="TrueType font for the tooltip text")
+    parser.add_argument('--scale', type=float, default=FONT_SCALE, help="Text size relative to the default")
+    parser.add_argument('--noise', type=float, default=NOISE, help="Standard deviation of the pixel noise")
+    parser.add_argument('--typo-rate', type=float, default=TYPO_RATE,
+                        help="Per-character error rate of the matching inputs")
+    parser.add_argument('--excel-rows', type=int, default=EXCEL_ROWS, help="Rows in the benchmarked report")
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help="Rounds per stage; the fastest one counts")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help="Stages to run")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Fail when a stage's throughput drops by more than this fraction of the baseline")
+    parser.add_argument('--output', help="Also write this run's results as JSON to this file")
+    parser.add_argument('--fingerprint-radius', action='store_true',
+                        help="Only measure the closest catalog names' title fingerprints, the safe lookup radius and "
+                             "how many noisy tooltips the fingerprint index recognizes")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # The synthetic inputs produce many per-item warnings (unmatched typos, rejected crops);
+    # only errors are logged so that log output doesn't distort the timings
+    logging.getLogger().setLevel(logging.ERROR)
+    if args.fingerprint_radius:
+        with tempfile.TemporaryDirectory() as work_folder:
+            result = measure_fingerprints(args.font, args.scale, args.samples, args.seed, args.noise, work_folder)
+        if result['closest'] is None:
+            logging.error("Fewer than two catalog names could be fingerprinted.")
+            return 1
+        distance, name, other_name = result['closest']
+        print(f"Closest title fingerprints: '{name}' / '{other_name}', {distance} bits apart")
+        print(f"Safe fingerprint_index.MAX_DISTANCE: up to {fingerprint_index.safe_radius(distance)} "
+              f"(currently {fingerprint_index.MAX_DISTANCE})")
+        print(f"Lookups of {result['lookups']} tooltips with noise {args.noise:g} at MAX_DISTANCE: "
+              f"{result['correct']:.1%} recognized, {result['wrong']:.1%} wrong, {result['missed']:.1%} sent to OCR")
+        return 0
+    settings = {'samples': args.samples, 'seed': args.seed, 'font': args.font, 'scale': args.scale,
+                'noise': args.noise, 'typo_rate': args.typo_rate, 'excel_rows': args.excel_rows, 'rounds': args.rounds}
+
+    with tempfile.TemporaryDirectory() as work_folder:
+        samples = build_samples(work_folder, args.samples, args.seed, args.font, args.scale, args.noise)
+        results = benchmark_stages(samples, args.stages, args.typo_rate, args.seed, args.excel_rows,
+                                   EXCEL_REPEATS, work_folder, args.rounds)
+    report = {'created': datetime.datetime.now().isoformat(timespec='seconds'), 'settings': settings,
+              'stages': results}
+
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    changes, regressions = {}, []
+    if baseline is not None:
+        if baseline['settings'] != settings:
+            logging.error(f"Baseline {args.baseline} was recorded with different settings: {baseline['settings']}")
+        changes, regressions = compare_to_baseline(results, baseline, args.threshold)
+    print_report(results, changes)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    if args.save_baseline:
+        save_baseline(args.baseline, report)
+    if regressions:
+        logging.error(f"Throughput regressed by more than {args.threshold:.0%} in: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
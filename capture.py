@@ -1,11 +1,16 @@
 import os
 import time
+import queue
+import argparse
 import datetime
 import logging
-import pyautogui
-import keyboard
+import cv2
+import numpy as np
 from PIL import ImageFont, ImageDraw, Image
-from threading import Thread
+from functools import partial
+from threading import Thread, Lock, Event
+import inventory_store
+import metrics
 
 # ----------------------- Configuration -----------------------
 
@@ -29,6 +34,25 @@ LOG_FILE = 'screenshot_automation.log'
 FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
 FONT_SIZE = 16
 
+# In-process pipeline: captured frames are queued for these OCR worker threads instead of
+# going through screenshots/ and a separate main.py run. A full queue makes the hotkey
+# handler wait up to PIPELINE_PUT_TIMEOUT seconds before the frame is dropped.
+PIPELINE_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 16
+PIPELINE_PUT_TIMEOUT = 5
+
+# Whether captures are still written to SCREENSHOT_FOLDER in pipeline mode
+SAVE_SCREENSHOTS = True
+
+# Burst mode: BURST_HOTKEY starts and stops capturing every BURST_INTERVAL seconds, and a
+# capture is dropped when at most BURST_DUPLICATE_DIFFERENCE of the text pixels in its aligned
+# title and trait crops have no counterpart within a pixel in the last kept capture. Repeated
+# captures of one tooltip differ by under 0.5% even with heavy pixel noise; catalog names
+# differing in one short word ("Heroic Robes/Shoes of the Resistance") by 1.2% or more.
+BURST_HOTKEY = 'ctrl+shift+b'
+BURST_INTERVAL = 0.25
+BURST_DUPLICATE_DIFFERENCE = 0.005
+
 # ------------------------------------------------------------
 
 def setup_logging():
@@ -72,63 +96,281 @@ def calculate_dynamic_capture_size(text="Example Item Name", traits=[]):
         logging.error(f"Failed to calculate dynamic size: {e}")
         return BASE_CAPTURE_WIDTH, BASE_CAPTURE_HEIGHT
 
-def capture_screenshot():
+def grab_screen_frame():
     """
-    Capture a screenshot of a region slightly to the left of the mouse cursor and save it.
+    Capture a region slightly to the left of the mouse cursor and return it as a PIL image.
     """
-    try:
-        # Dummy text for testing dynamic size calculation
-        item_name = "Lequirus's Wicked Thorns"
-        traits = ["Humanoid Bonus Damage", "Off-Hand Double Attack"]
+    import pyautogui
+
+    # Dummy text for testing dynamic size calculation
+    item_name = "Lequirus's Wicked Thorns"
+    traits = ["Humanoid Bonus Damage", "Off-Hand Double Attack"]
+
+    # Get current mouse position
+    x, y = pyautogui.position()
+    logging.info(f"Mouse position: ({x}, {y})")
 
-        # Get current mouse position
-        x, y = pyautogui.position()
-        logging.info(f"Mouse position: ({x}, {y})")
+    # Calculate dynamic capture size
+    capture_width, capture_height = calculate_dynamic_capture_size(item_name, traits)
 
-        # Calculate dynamic capture size
-        capture_width, capture_height = calculate_dynamic_capture_size(item_name, traits)
+    # Calculate the top-left corner of the capture area with offset
+    left = x + OFFSET_LEFT
+    top = y + OFFSET_TOP
 
-        # Calculate the top-left corner of the capture area with offset
-        left = x + OFFSET_LEFT
-        top = y + OFFSET_TOP
+    # Ensure the capture area is within screen bounds
+    screen_width, screen_height = pyautogui.size()
+    left = max(0, min(left, screen_width - capture_width))
+    top = max(0, min(top, screen_height - capture_height))
+
+    logging.info(f"Capturing region: Left={left}, Top={top}, Width={capture_width}, Height={capture_height}")
+
+    # Capture the region
+    return pyautogui.screenshot(region=(left, top, capture_width, capture_height))
+
+class DuplicateFilter:
+    """
+    Remembers the tooltip of the last kept capture and flags captures showing the same one.
+
+    Tooltips are compared pixel by pixel on their binarized, template-aligned title and trait
+    crops, so moving the cursor within the item or background changes don't matter, while
+    names differing in a single short word do.
+    """
 
-        # Ensure the capture area is within screen bounds
-        screen_width, screen_height = pyautogui.size()
-        left = max(0, min(left, screen_width - capture_width))
-        top = max(0, min(top, screen_height - capture_height))
+    def __init__(self, title_template, trait_template):
+        self.title_template = title_template
+        self.trait_template = trait_template
+        self._last = None
+        self._lock = Lock()
 
-        logging.info(f"Capturing region: Left={left}, Top={top}, Width={capture_width}, Height={capture_height}")
+    def tooltip_crops(self, frame):
+        # The binarized (text = True) title and trait crops of the frame, or None without a tooltip
+        import crop_screenshot
 
-        # Capture the region
-        screenshot = pyautogui.screenshot(region=(left, top, capture_width, capture_height))
+        crops = crop_screenshot.crop_image(frame, self.title_template, self.trait_template, source='burst frame',
+                                           log_rejections=False)
+        if crops is None:
+            return None
+        binaries = []
+        for crop in crops:
+            gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            ink = binary > 127
+            binaries.append(~ink if ink.mean() > 0.5 else ink)
+        return tuple(binaries)
+
+    @staticmethod
+    def crop_difference(new, old):
+        """
+        Fraction of the ink of two aligned binarized crops that has no counterpart in the
+        other within one pixel; 1.0 when their sizes differ.
+        """
+        if new.shape != old.shape:
+            return 1.0
+        kernel = np.ones((3, 3), np.uint8)
+        new_near = cv2.dilate(new.view(np.uint8), kernel).astype(bool)
+        old_near = cv2.dilate(old.view(np.uint8), kernel).astype(bool)
+        unmatched = np.count_nonzero(new & ~old_near) + np.count_nonzero(old & ~new_near)
+        return unmatched / max(1, np.count_nonzero(new) + np.count_nonzero(old))
+
+    def should_drop(self, frame):
+        """
+        True when the frame shows no tooltip or the same tooltip as the last kept frame.
+        Otherwise the frame becomes the one later frames are compared with.
+        """
+        crops = self.tooltip_crops(frame)
+        with self._lock:
+            if crops is None:
+                # The cursor left the item; the next tooltip counts even if it is the same item
+                self._last = None
+                return True
+            if self._last is not None and all(self.crop_difference(new, old) <= BURST_DUPLICATE_DIFFERENCE
+                                              for new, old in zip(crops, self._last)):
+                return True
+            self._last = crops
+            return False
+
+def capture_screenshot(frame_source=grab_screen_frame, frames=None, save=True, duplicate_filter=None):
+    """
+    Capture a frame and save it to the screenshot folder and/or queue it for the pipeline.
+
+    frame_source returns a PIL image (the screen by default, or a fake source in tests).
+    With a frames queue, the frame is pushed as (unique_id, BGR array) for the pipeline
+    workers; the PNG is only written when save is set. With a duplicate_filter, captures
+    without a tooltip or of the tooltip captured last are dropped before either happens.
+    """
+    try:
+        screenshot = frame_source()
 
         # Generate timestamped filename
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"screenshot_{timestamp}.png"
-        filepath = os.path.join(SCREENSHOT_FOLDER, filename)
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')  # includes microseconds
+        unique_id = f"screenshot_{timestamp}"
+
+        if frames is not None or duplicate_filter is not None:
+            frame = np.ascontiguousarray(np.asarray(screenshot.convert('RGB'))[:, :, ::-1])
+            if duplicate_filter is not None and duplicate_filter.should_drop(frame):
+                metrics.increment('capture_dropped_duplicate')
+                logging.debug(f"Dropped '{unique_id}': no new tooltip since the previous capture.")
+                return
+
+        if frames is not None:
+            try:
+                frames.put((unique_id, frame), timeout=PIPELINE_PUT_TIMEOUT)
+                metrics.set_gauge('capture_queue_depth', frames.qsize())
+                logging.info(f"Queued '{unique_id}' for processing ({frames.qsize()} waiting).")
+            except queue.Full:
+                metrics.increment('capture_dropped_queue_full')
+                logging.error(f"Pipeline queue is full, dropped '{unique_id}'.")
 
-        # Save the screenshot
-        screenshot.save(filepath)
-        logging.info(f"Screenshot saved as '{filepath}'.")
+        if save or frames is None:
+            filepath = os.path.join(SCREENSHOT_FOLDER, f"{unique_id}.png")
+
+            # Save the screenshot
+            screenshot.save(filepath)
+            logging.info(f"Screenshot saved as '{filepath}'.")
 
     except Exception as e:
         logging.error(f"Failed to capture screenshot: {e}")
 
-def hotkey_listener():
+# Rows from the pipeline workers are appended to the output CSV one at a time
+_output_lock = Lock()
+
+def pipeline_worker(frames, title_template, trait_template):
+    """
+    Crop, OCR and record queued frames until a None sentinel arrives.
+    """
+    import crop_screenshot
+    import main
+
+    while True:
+        item = frames.get()
+        try:
+            if item is None:
+                return
+            unique_id, frame = item
+            crops = crop_screenshot.crop_image(frame, title_template, trait_template, source=unique_id)
+            if crops is None:
+                continue
+            with metrics.timer('capture_frame'):
+                row = main.process_image_pair(unique_id, *crops)
+            if row:
+                with _output_lock:
+                    main.append_rows([row])
+                logging.info(f"Recorded '{unique_id}': {row['Matched Items']} / {row['Matched Traits']}")
+        except Exception as e:
+            logging.error(f"Failed to process captured frame: {e}")
+        finally:
+            frames.task_done()
+
+def start_pipeline(workers=PIPELINE_WORKERS, queue_size=PIPELINE_QUEUE_SIZE, inventory_db=None):
+    """
+    Start the pipeline worker threads. Returns (frames queue, threads), or (None, []) when
+    the templates can't be loaded. With inventory_db, rows are also upserted into that store.
+    """
+    import crop_screenshot
+    import main
+
+    if inventory_db:
+        main.INVENTORY_DB_PATH = inventory_db
+
+    title_template, trait_template = crop_screenshot.load_templates(main.TEMPLATES_FOLDER)
+    if title_template is None or trait_template is None:
+        return None, []
+    # Load the catalogs before the first capture rather than during it
+    main.ensure_catalogs()
+
+    frames = queue.Queue(maxsize=queue_size)
+    threads = [Thread(target=pipeline_worker, args=(frames, title_template, trait_template), daemon=True)
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    logging.info(f"Capture pipeline running with {workers} workers.")
+    return frames, threads
+
+def stop_pipeline(frames, threads):
+    """
+    Let the workers finish the queued frames, then stop them.
+    """
+    for _ in threads:
+        frames.put(None)
+    for thread in threads:
+        thread.join()
+
+def burst_capture(active, frames=None, save=True, duplicate_filter=None, frame_source=grab_screen_frame):
+    """
+    Capture every BURST_INTERVAL seconds while the active event is set.
+    """
+    while True:
+        active.wait()
+        started = time.monotonic()
+        capture_screenshot(frame_source, frames, save, duplicate_filter)
+        time.sleep(max(BURST_INTERVAL - (time.monotonic() - started), 0))
+
+def toggle_burst(active):
+    if active.is_set():
+        active.clear()
+        logging.info("Burst capture stopped.")
+    else:
+        active.set()
+        logging.info("Burst capture started.")
+
+def hotkey_listener(frames=None, save=True, duplicate_filter=None):
     """
     Listen for the hotkey and capture screenshot when triggered.
     """
+    import keyboard
+
     logging.info(f"Listening for hotkey '{HOTKEY}' to capture screenshots.")
-    keyboard.add_hotkey(HOTKEY, capture_screenshot)
+    keyboard.add_hotkey(HOTKEY, partial(capture_screenshot, frames=frames, save=save, duplicate_filter=duplicate_filter))
+    if duplicate_filter is not None:
+        active = Event()
+        Thread(target=burst_capture, args=(active, frames, save, duplicate_filter), daemon=True).start()
+        logging.info(f"Press '{BURST_HOTKEY}' to start or stop burst capture.")
+        keyboard.add_hotkey(BURST_HOTKEY, partial(toggle_burst, active))
     # Block forever, waiting for hotkeys
     keyboard.wait()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Capture inventory screenshots with a hotkey.")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Crop and OCR every capture in this process as soon as it is taken")
+    parser.add_argument('--workers', type=int, default=PIPELINE_WORKERS,
+                        help="Number of pipeline worker threads")
+    parser.add_argument('--no-save', action='store_true',
+                        help=f"With --pipeline, don't write the captures to {SCREENSHOT_FOLDER}")
+    parser.add_argument('--burst', action='store_true',
+                        help=f"Drop captures of the tooltip captured last, and capture continuously while '{BURST_HOTKEY}' is toggled on")
+    parser.add_argument('--inventory-db', nargs='?', const=inventory_store.DEFAULT_DB_PATH, default=None,
+                        metavar='PATH', help="With --pipeline, also upsert every row into a SQLite inventory store")
+    parser.add_argument('--metrics', nargs='?', const='output', default=None, metavar='FOLDER',
+                        help="Time every stage and write metrics.json and metrics.prom to the folder on exit")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     setup_logging()
-    create_screenshot_folder()
+    metrics.enable(bool(args.metrics))
+    save = not args.pipeline or (SAVE_SCREENSHOTS and not args.no_save)
+    if save:
+        create_screenshot_folder()
+
+    duplicate_filter = None
+    if args.burst:
+        import crop_screenshot
+        title_template, trait_template = crop_screenshot.load_templates(crop_screenshot.TEMPLATES_FOLDER)
+        if title_template is None or trait_template is None:
+            logging.error("Burst mode needs the structural templates. Exiting.")
+            return
+        duplicate_filter = DuplicateFilter(title_template, trait_template)
+
+    frames, threads = None, []
+    if args.pipeline:
+        frames, threads = start_pipeline(args.workers, inventory_db=args.inventory_db)
+        if frames is None:
+            logging.error("Failed to start the capture pipeline. Exiting.")
+            return
 
     # Start the hotkey listener in a separate thread
-    listener_thread = Thread(target=hotkey_listener, daemon=True)
+    listener_thread = Thread(target=hotkey_listener, args=(frames, save, duplicate_filter), daemon=True)
     listener_thread.start()
 
     logging.info("Screenshot automation is running. Press ESC to exit.")
@@ -138,6 +380,16 @@ def main():
             time.sleep(1)
     except KeyboardInterrupt:
         logging.info("Screenshot automation terminated by user.")
+        if frames is not None:
+            stop_pipeline(frames, threads)
+        if args.metrics:
+            counters = None
+            if frames is not None:
+                # The OCR run counters (cache hits, cascade fallbacks, ...) are kept by main.py
+                import main as ocr_pipeline
+                counters = ocr_pipeline.ocr_counters
+            json_path, prometheus_path = metrics.write_reports(args.metrics, counters)
+            logging.info(f"Metrics written to {json_path} and {prometheus_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import os
+import pickle
+import numpy as np
+
+# ------------------- Compiled Catalog -------------------
+# The catalog state built from the CSVs is pickled to <folder>/<key>.pkl, keyed by a hash of
+# the source files' contents. Numpy arrays inside it are stored next to it as .npy files and
+# memory-mapped read-only on load, so every process maps the same pages instead of holding a
+# copy. A changed source file changes the key, and the next load rebuilds the artifact.
+
+
+def artifact_key(paths, version):
+    """
+    Hash of the build version and the contents of the source files, or None if one is missing.
+    """
+    digest = hashlib.sha256(f'catalog-v{version}'.encode())
+    for path in paths:
+        if not os.path.exists(path):
+            return None
+        digest.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+class _ArtifactPickler(pickle.Pickler):
+    def __init__(self, file, prefix):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.prefix = prefix
+        self.arrays = 0
+
+    def persistent_id(self, obj):
+        if type(obj) is not np.ndarray or obj.dtype.hasobject:
+            return None
+        name = f'{self.prefix}.{self.arrays}.npy'
+        self.arrays += 1
+        tmp_path = name + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            np.save(file, obj)
+        os.replace(tmp_path, name)
+        return os.path.basename(name)
+
+
+class _ArtifactUnpickler(pickle.Unpickler):
+    def __init__(self, file, folder):
+        super().__init__(file)
+        self.folder = folder
+
+    def persistent_load(self, pid):
+        return np.load(os.path.join(self.folder, pid), mmap_mode='r')
+
+
+def save_artifact(folder, key, state):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'{key}.pkl')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        _ArtifactPickler(file, os.path.join(folder, key)).dump(state)
+    # The .pkl appears last, once all its arrays are in place
+    os.replace(tmp_path, path)
+    for name in os.listdir(folder):
+        if not name.startswith(key + '.'):
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+
+
+def load_artifact(folder, key):
+    path = os.path.join(folder, f'{key}.pkl')
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as file:
+            return _ArtifactUnpickler(file, folder).load()
+    except Exception as e:
+        logging.warning(f"Failed to load compiled catalog {path}, rebuilding it: {e}")
+        return None
+
+
+def load_or_build(folder, paths, version, build):
+    """
+    Return the compiled catalog for the source paths, calling build() and saving its result
+    when there is no artifact for their current contents. Without all the sources, build()
+    is called and nothing is saved.
+    """
+    key = artifact_key(paths, version)
+    if key is None:
+        return build()
+    state = load_artifact(folder, key)
+    if state is not None:
+        logging.info(f"Loaded compiled catalog {key}")
+        return state
+    state = build()
+    try:
+        save_artifact(folder, key, state)
+        logging.info(f"Compiled catalog {key} from {', '.join(paths)}")
+    except OSError as e:
+        logging.error(f"Failed to save compiled catalog: {e}")
+        return state
+    # Hand back the memory-mapped copy so this process shares pages with the others too
+    return load_artifact(folder, key) or state
+# ---------------------------------------------------------
@@ -1,17 +1,52 @@
 import os
 import cv2
-from PIL import Image
 import logging
+import argparse
+from multiprocessing import Pool
 from datetime import datetime
+import metrics
 
 # Paths
 SCREENSHOT_FOLDER = 'screenshots'            # Folder containing screenshots
 TEMPLATES_FOLDER = 'templates'               # Folder containing template images (structural templates)
 CROPPED_FOLDER = 'cropped_screenshots'       # Folder to save cropped images
 LOG_FILE = 'crop_screenshot.log'             # Log file path
+SCREENSHOT_EXTENSIONS = ('.png', '.jpg', '.jpeg')
 
-# Logging setup
-logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler()])
+# Offsets to expand the cropped area from the matched region
+TITLE_EXPAND_WIDTH = 400  # Adjust width as needed
+TITLE_EXPAND_HEIGHT = 75  # Adjust height as needed
+TRAIT_EXPAND_WIDTH = 400  # Adjust width as needed
+TRAIT_EXPAND_HEIGHT = 75  # Adjust height as needed
+
+# Coarse-to-fine template search: match on a copy downscaled by up to 2**PYRAMID_LEVELS
+# (while the template stays at least MIN_COARSE_TEMPLATE_SIZE pixels), then refine the best
+# COARSE_CANDIDATES peaks at full resolution within REFINE_MARGIN pixels of each
+PYRAMID_LEVELS = 2
+MIN_COARSE_TEMPLATE_SIZE = 12
+COARSE_CANDIDATES = 3
+REFINE_MARGIN = 4
+
+# Captures whose best TM_CCOEFF_NORMED score is below these are rejected instead of cropped
+MIN_TITLE_SCORE = 0.6
+MIN_TRAIT_SCORE = 0.6
+
+# Parallel cropping: worker processes (1 crops serially in this process) and screenshots
+# handed to a worker at a time
+CROP_WORKERS = 1
+CROP_CHUNK_SIZE = 4
+
+# Template pyramids, built once per template and reused for every screenshot
+_template_pyramids = {}
+
+# Templates loaded once in every cropping worker process
+_worker_templates = (None, None)
+
+def setup_logging():
+    """
+    Configure logging to file and console.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler()])
 
 def load_template(template_path):
     """
@@ -22,71 +57,269 @@ def load_template(template_path):
         logging.error(f"Failed to load template image from '{template_path}'.")
     return template
 
-def crop_sections(screenshot_path, title_template, trait_template, output_folder):
+def load_templates(templates_folder=TEMPLATES_FOLDER):
+    """
+    Load the title and trait structural templates. Returns (None, None) on failure.
+    """
+    title_template = load_template(os.path.join(templates_folder, 'title_template.png'))
+    trait_template = load_template(os.path.join(templates_folder, 'trait_template.png'))
+    if title_template is None or trait_template is None:
+        logging.error("Failed to load one or more templates.")
+        return None, None
+    return title_template, trait_template
+
+def list_screenshots(screenshot_folder=SCREENSHOT_FOLDER):
+    """
+    Return the sorted paths of all screenshots in a folder.
+    """
+    return [os.path.join(screenshot_folder, screenshot_file)
+            for screenshot_file in sorted(os.listdir(screenshot_folder))
+            if screenshot_file.lower().endswith(SCREENSHOT_EXTENSIONS)]
+
+def template_pyramid(template):
+    """
+    Return the cached [full, half, quarter, ...] grayscale pyramid of a template.
+    """
+    # Keyed by content, since process pool workers receive a fresh copy of the template per task
+    key = (template.shape, template.tobytes())
+    pyramid = _template_pyramids.get(key)
+    if pyramid is None:
+        pyramid = [template]
+        while (len(pyramid) <= PYRAMID_LEVELS
+               and min(pyramid[-1].shape[:2]) // 2 >= MIN_COARSE_TEMPLATE_SIZE):
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        _template_pyramids[key] = pyramid
+    return pyramid
+
+def image_pyramid(image, levels):
+    """
+    Return [image, image / 2, ...] with levels + 1 entries.
+    """
+    pyramid = [image]
+    for _ in range(levels):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+def match_template(image, template):
+    """
+    Return (max_val, (x, y)) of the best TM_CCOEFF_NORMED match, or (-1.0, None) if the
+    template doesn't fit in the image.
+    """
+    if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+        return -1.0, None
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+def locate_template(screenshot_pyramid, template, top=0):
+    """
+    Find a template in the rows of a screenshot at or below top.
+
+    The search runs on the coarsest pyramid level the template allows, and the best coarse
+    peaks are refined in small full-resolution windows. Returns (max_val, (x, y)), or
+    (-1.0, None) when the template is too small to search coarsely.
+    """
+    screenshot_gray = screenshot_pyramid[0]
+    template_levels = template_pyramid(template)
+    level = min(len(template_levels), len(screenshot_pyramid)) - 1
+    template_height, template_width = template.shape[:2]
+    best_val, best_loc = -1.0, None
+
+    if level > 0:
+        scale = 2 ** level
+        coarse_top = -(-top // scale)
+        coarse_template = template_levels[level]
+        coarse_image = screenshot_pyramid[level][coarse_top:]
+        if coarse_image.shape[0] >= coarse_template.shape[0] and coarse_image.shape[1] >= coarse_template.shape[1]:
+            coarse_result = cv2.matchTemplate(coarse_image, coarse_template, cv2.TM_CCOEFF_NORMED)
+            for _ in range(COARSE_CANDIDATES):
+                _, _, _, (coarse_x, coarse_y) = cv2.minMaxLoc(coarse_result)
+                # Full-resolution window around the candidate, kept inside the search region
+                margin = scale + REFINE_MARGIN
+                x0 = max(coarse_x * scale - margin, 0)
+                y0 = max((coarse_top + coarse_y) * scale - margin, top)
+                window = screenshot_gray[y0:y0 + template_height + 2 * margin,
+                                         x0:x0 + template_width + 2 * margin]
+                val, loc = match_template(window, template)
+                if loc is not None and val > best_val:
+                    best_val, best_loc = val, (x0 + loc[0], y0 + loc[1])
+                # Suppress this peak before taking the next one
+                coarse_result[max(coarse_y - coarse_template.shape[0] // 2, 0):coarse_y + coarse_template.shape[0] // 2 + 1,
+                              max(coarse_x - coarse_template.shape[1] // 2, 0):coarse_x + coarse_template.shape[1] // 2 + 1] = -1.0
+
+    return best_val, best_loc
+
+def find_template(screenshot_pyramid, template, min_score, top=0):
+    """
+    Coarse-to-fine search with a full-resolution fallback when the coarse peaks refine to
+    less than min_score. Returns (max_val, (x, y)).
+    """
+    max_val, max_loc = locate_template(screenshot_pyramid, template, top)
+    if max_val < min_score:
+        val, loc = match_template(screenshot_pyramid[0][top:], template)
+        if loc is not None and val > max_val:
+            max_val, max_loc = val, (loc[0], loc[1] + top)
+    return max_val, max_loc
+
+def crop_sections(screenshot_path, title_template, trait_template, output_folder=None, unique_id=None):
     """
     Crop item title and trait sections based on structural templates and fixed offsets.
+
+    Returns the (title_crop, trait_crop) BGR arrays, or None on failure. The crops are
+    only written to disk when an output folder is given, named after unique_id if set.
     """
     try:
         # Load the screenshot
-        screenshot = cv2.imread(screenshot_path)
+        with metrics.timer('crop_decode'):
+            screenshot = cv2.imread(screenshot_path)
         if screenshot is None:
             logging.error(f"Failed to load screenshot '{screenshot_path}'.")
-            return
-        
-        screenshot_gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-        
-        # Define offsets to expand the cropped area from the matched region
-        TITLE_EXPAND_WIDTH = 400  # Adjust width as needed
-        TITLE_EXPAND_HEIGHT = 75 # Adjust height as needed
-        TRAIT_EXPAND_WIDTH = 400  # Adjust width as needed
-        TRAIT_EXPAND_HEIGHT = 75 # Adjust height as needed
-
-        # Perform template matching for title region
-        res_title = cv2.matchTemplate(screenshot_gray, title_template, cv2.TM_CCOEFF_NORMED)
-        _, max_val_title, _, max_loc_title = cv2.minMaxLoc(res_title)
-        
-        # Perform template matching for trait region
-        res_trait = cv2.matchTemplate(screenshot_gray, trait_template, cv2.TM_CCOEFF_NORMED)
-        _, max_val_trait, _, max_loc_trait = cv2.minMaxLoc(res_trait)
-        
-        # Get a unique timestamp with milliseconds for each image
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')  # includes microseconds
+            return None
+    except Exception as e:
+        logging.error(f"Error cropping sections from '{screenshot_path}': {e}")
+        return None
+    return crop_image(screenshot, title_template, trait_template, output_folder, unique_id, screenshot_path)
+
+def crop_image(screenshot, title_template, trait_template, output_folder=None, unique_id=None, source='frame',
+               log_rejections=True):
+    """
+    Crop the title and trait sections out of an in-memory BGR screenshot, as crop_sections
+    does for a file. source names the screenshot in log messages; log_rejections=False
+    keeps frames without a tooltip out of the log.
+    """
+    try:
+        with metrics.timer('crop_locate_title'):
+            screenshot_gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+            screenshot_pyramid = image_pyramid(screenshot_gray, PYRAMID_LEVELS)
+
+            # Perform template matching for title region
+            max_val_title, max_loc_title = find_template(screenshot_pyramid, title_template, MIN_TITLE_SCORE)
+        if max_val_title < MIN_TITLE_SCORE:
+            metrics.increment('crop_rejected_title')
+            if log_rejections:
+                logging.warning(f"Rejected '{source}': title match score {max_val_title:.2f} is below {MIN_TITLE_SCORE}.")
+            return None
+
+        # Perform template matching for trait region, which is always below the title
+        trait_top = max_loc_title[1] + title_template.shape[0]
+        with metrics.timer('crop_locate_trait'):
+            max_val_trait, max_loc_trait = find_template(screenshot_pyramid, trait_template, MIN_TRAIT_SCORE, trait_top)
+        if max_val_trait < MIN_TRAIT_SCORE:
+            metrics.increment('crop_rejected_trait')
+            if log_rejections:
+                logging.warning(f"Rejected '{source}': trait match score {max_val_trait:.2f} is below {MIN_TRAIT_SCORE}.")
+            return None
         
         # Crop Title Section
         x, y = max_loc_title
         title_crop = screenshot[y:y+TITLE_EXPAND_HEIGHT, x:x+TITLE_EXPAND_WIDTH]
-        title_image_path = os.path.join(output_folder, f"title_cropped_{timestamp}.png")
-        Image.fromarray(cv2.cvtColor(title_crop, cv2.COLOR_BGR2RGB)).save(title_image_path)
-        logging.info(f"Cropped title image saved at '{title_image_path}'")
         
         # Crop Trait Section
         x, y = max_loc_trait
         trait_crop = screenshot[y:y+TRAIT_EXPAND_HEIGHT, x:x+TRAIT_EXPAND_WIDTH]
-        trait_image_path = os.path.join(output_folder, f"trait_cropped_{timestamp}.png")
-        Image.fromarray(cv2.cvtColor(trait_crop, cv2.COLOR_BGR2RGB)).save(trait_image_path)
-        logging.info(f"Cropped trait image saved at '{trait_image_path}'")
+
+        if output_folder:
+            save_crops(title_crop, trait_crop, output_folder, unique_id)
+
+        return title_crop, trait_crop
         
     except Exception as e:
-        logging.error(f"Error cropping sections from '{screenshot_path}': {e}")
+        logging.error(f"Error cropping sections from '{source}': {e}")
+        return None
+
+def save_crops(title_crop, trait_crop, output_folder, unique_id=None):
+    """
+    Write a title/trait crop pair to disk using the cropped_screenshots naming scheme.
+    """
+    # Get a unique timestamp with milliseconds for each image
+    timestamp = unique_id or datetime.now().strftime('%Y%m%d_%H%M%S_%f')  # includes microseconds
+
+    title_image_path = os.path.join(output_folder, f"title_cropped_{timestamp}.png")
+    cv2.imwrite(title_image_path, title_crop)
+    logging.info(f"Cropped title image saved at '{title_image_path}'")
+
+    trait_image_path = os.path.join(output_folder, f"trait_cropped_{timestamp}.png")
+    cv2.imwrite(trait_image_path, trait_crop)
+    logging.info(f"Cropped trait image saved at '{trait_image_path}'")
+
+def init_crop_worker(templates_folder, metrics_enabled=False):
+    """
+    Load the templates once per cropping worker process.
+    """
+    global _worker_templates
+    metrics.enable(metrics_enabled)
+    # One OpenCV thread per process; the pool already keeps every core busy
+    cv2.setNumThreads(1)
+    _worker_templates = load_templates(templates_folder)
+
+def crop_in_worker(task):
+    """
+    Crop one (screenshot_path, output_folder, unique_id) task with the worker's templates.
+    Returns (screenshot_path, crops, metrics recorded for it).
+    """
+    screenshot_path, output_folder, unique_id = task
+    title_template, trait_template = _worker_templates
+    if title_template is None or trait_template is None:
+        return screenshot_path, None, metrics.drain()
+    crops = crop_sections(screenshot_path, title_template, trait_template, output_folder, unique_id)
+    return screenshot_path, crops, metrics.drain()
+
+def crop_screenshots_parallel(screenshot_paths, output_folder=None, templates_folder=TEMPLATES_FOLDER,
+                              workers=None, chunk_size=CROP_CHUNK_SIZE):
+    """
+    Crop screenshots on a process pool, yielding (screenshot_path, crops) in completion order.
+
+    crops is the (title_crop, trait_crop) pair or None on failure. Saved crops get a
+    digits-only id made of the run's start time and the screenshot's position, since
+    concurrent workers can't rely on microsecond timestamps being unique.
+    """
+    run_stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    tasks = [(screenshot_path, output_folder, f"{run_stamp}{index:06d}")
+             for index, screenshot_path in enumerate(screenshot_paths)]
+    with Pool(processes=workers, initializer=init_crop_worker, initargs=(templates_folder, metrics.enabled)) as pool:
+        for screenshot_path, crops, worker_metrics in pool.imap_unordered(crop_in_worker, tasks, chunksize=chunk_size):
+            metrics.merge(worker_metrics)
+            yield screenshot_path, crops
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crop the title and trait sections out of inventory screenshots.")
+    parser.add_argument('--workers', type=int, default=CROP_WORKERS,
+                        help="Crop on this many worker processes (0 uses every core, 1 crops serially)")
+    parser.add_argument('--chunk-size', type=int, default=CROP_CHUNK_SIZE,
+                        help="Number of screenshots sent to a worker process at a time")
+    parser.add_argument('--metrics', nargs='?', const='output', default=None, metavar='FOLDER',
+                        help="Time every stage and write metrics.json and metrics.prom to the folder")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    setup_logging()
+    metrics.enable(bool(args.metrics))
     os.makedirs(CROPPED_FOLDER, exist_ok=True)
-    
-    # Load structural templates for title and trait regions
-    title_template_path = os.path.join(TEMPLATES_FOLDER, 'title_template.png')
-    trait_template_path = os.path.join(TEMPLATES_FOLDER, 'trait_template.png')
-    title_template = load_template(title_template_path)
-    trait_template = load_template(trait_template_path)
-    
-    if title_template is None or trait_template is None:
-        logging.error("Failed to load one or more templates. Exiting.")
-        return
-    
-    # Process all screenshots in the folder
-    for screenshot_file in os.listdir(SCREENSHOT_FOLDER):
-        screenshot_path = os.path.join(SCREENSHOT_FOLDER, screenshot_file)
-        if screenshot_file.lower().endswith(('.png', '.jpg', '.jpeg')):
+    screenshot_paths = list_screenshots(SCREENSHOT_FOLDER)
+
+    if args.workers != 1:
+        cropped = 0
+        for cropped_count, (screenshot_path, crops) in enumerate(
+                crop_screenshots_parallel(screenshot_paths, CROPPED_FOLDER, TEMPLATES_FOLDER,
+                                          args.workers or None, args.chunk_size), start=1):
+            cropped += crops is not None
+            logging.info(f"[{cropped_count}/{len(screenshot_paths)}] Finished '{screenshot_path}'")
+        logging.info(f"Cropped {cropped} of {len(screenshot_paths)} screenshots.")
+    else:
+        # Load structural templates for title and trait regions
+        title_template, trait_template = load_templates()
+        if title_template is None or trait_template is None:
+            logging.error("Failed to load one or more templates. Exiting.")
+            return
+
+        # Process all screenshots in the folder
+        for screenshot_path in screenshot_paths:
             crop_sections(screenshot_path, title_template, trait_template, CROPPED_FOLDER)
 
+    if args.metrics:
+        json_path, prometheus_path = metrics.write_reports(args.metrics)
+        logging.info(f"Metrics written to {json_path} and {prometheus_path}")
+
 if __name__ == "__main__":
     main()
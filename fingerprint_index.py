@@ -0,0 +1,202 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import cv2
+import numpy as np
+import title_templates
+
+# ------------------- Configuration -------------------
+
+# Fingerprint grid: the crop's text line is trimmed to its ink and reduced to this many cells,
+# one bit each (above or below the mean ink coverage)
+HASH_HEIGHT = 12
+HASH_WIDTH = 96
+
+# When trimming the text line, rows with less ink than this fraction of the fullest row and
+# columns with fewer ink pixels than MIN_COLUMN_INK count as noise, so stray pixels next to
+# the text don't stretch it
+MIN_ROW_INK_FRACTION = 0.05
+MIN_COLUMN_INK = 2
+
+# Stored in the index file; fingerprints of an older hash version are discarded on open
+HASH_VERSION = 2
+
+# A crop matches a stored fingerprint within this Hamming distance (out of
+# HASH_HEIGHT * HASH_WIDTH bits). A crop of an item that isn't stored yet must not fall within
+# it of a similar name, so it stays below half the smallest distance between two rendered
+# catalog names: "Robes of the Resistance" / "Shoes of the Resistance" titles are 62 bits
+# apart, "PvP Double Fear Evasion" / "PvP Double Bind Evasion" traits 68. Crops of one title
+# at other positions with pixel noise (sigma 8) are a median of 10 bits from each other, and
+# 94% of them are recognized at this distance.
+# Re-measure with `python benchmark.py --fingerprint-radius` after changing the catalog, the
+# font or the grid.
+MAX_DISTANCE = 24
+
+# The closest name must also beat every other name by more than this many bits
+MATCH_MARGIN = 12
+
+# New fingerprints this close to one already stored for the same name are not added
+DUPLICATE_DISTANCE = 8
+
+# -----------------------------------------------------
+
+
+def perceptual_hash(binary):
+    """
+    Perceptual hash of a binarized crop's text line as an int, or None when the crop has no
+    text or the line is cut off by the crop's edge (it could then be any name sharing the
+    visible part).
+    """
+    ink = title_templates.text_ink(binary)
+    if not ink.any() or title_templates.is_clipped(binary):
+        return None
+    line = title_templates.title_line(ink)
+    row_ink = line.sum(axis=1)
+    rows = np.flatnonzero(row_ink >= MIN_ROW_INK_FRACTION * row_ink.max())
+    line = line[rows[0]:rows[-1] + 1]
+    columns = np.flatnonzero(line.sum(axis=0) >= MIN_COLUMN_INK)
+    if columns.size == 0:
+        return None
+    text = line[:, columns[0]:columns[-1] + 1].astype(np.float32)
+    cells = cv2.resize(text, (HASH_WIDTH, HASH_HEIGHT), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(cells > cells.mean()).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def closest_names(fingerprints):
+    """
+    Return (distance, name, other name) for the two different names whose fingerprints are
+    closest, given {name: [fingerprint, ...]}, or None with fewer than two names.
+    """
+    entries = [(name, value) for name, values in fingerprints.items() for value in values]
+    closest = None
+    for index, (name, value) in enumerate(entries):
+        for other_name, other_value in entries[index + 1:]:
+            if other_name != name:
+                distance = hamming(value, other_value)
+                if closest is None or distance < closest[0]:
+                    closest = (distance, name, other_name)
+    return closest
+
+
+def safe_radius(min_name_distance):
+    # Largest radius at which a crop within it of its own name can't also be within it of another
+    return max(0, (min_name_distance - 1) // 2)
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over Hamming distance: a radius query only visits the children
+    whose edge distance can still lead to a match.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, name):
+        self.size += 1
+        node = [value, name, {}]
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, radius):
+        """
+        Return [(distance, name), ...] for every stored value within radius.
+        """
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_value, node_name, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.append((distance, node_name))
+            for edge, child in children.items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class FingerprintIndex:
+    """
+    On-disk index of confirmed crop fingerprints and the catalog names they resolved to,
+    kept in memory as one BK-tree per crop type.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._trees = {}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " image_type TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " PRIMARY KEY (image_type, hash))"
+        )
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version != HASH_VERSION:
+            removed = self._connection.execute("DELETE FROM fingerprints").rowcount
+            self._connection.execute(f"PRAGMA user_version = {HASH_VERSION}")
+            if removed:
+                logging.info(f"Discarded {removed} fingerprints of hash version {version} from {path}")
+        self._connection.commit()
+        for image_type, hash_hex, name in self._connection.execute("SELECT image_type, hash, name FROM fingerprints"):
+            self._tree(image_type).add(int(hash_hex, 16), name)
+        logging.info(f"Loaded {sum(tree.size for tree in self._trees.values())} fingerprints from {path}")
+
+    def _tree(self, image_type):
+        return self._trees.setdefault(image_type, BKTree())
+
+    def lookup(self, image_type, value):
+        """
+        Return the name of the closest stored fingerprint, or None when nothing is within
+        MAX_DISTANCE or another name is within MATCH_MARGIN bits of it.
+        """
+        with self._lock:
+            matches = self._tree(image_type).search(value, MAX_DISTANCE + MATCH_MARGIN)
+        if not matches:
+            return None
+        best_distance, best_name = min(matches)
+        if best_distance > MAX_DISTANCE:
+            return None
+        if any(distance - best_distance <= MATCH_MARGIN for distance, name in matches if name != best_name):
+            return None
+        return best_name
+
+    def add(self, image_type, value, name):
+        """
+        Store a confirmed fingerprint unless a near-identical one already exists for the name.
+        """
+        with self._lock:
+            tree = self._tree(image_type)
+            if any(known == name for _, known in tree.search(value, DUPLICATE_DISTANCE)):
+                return
+            tree.add(value, name)
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO fingerprints (image_type, hash, name, created) VALUES (?, ?, ?, ?)",
+                    (image_type, format(value, 'x'), name, time.time())
+                )
+                self._connection.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to store fingerprint for '{name}': {e}")
@@ -1,17 +1,62 @@
+import numpy as np
 import pandas as pd
 import os
-from openpyxl.styles import PatternFill, Font
+import argparse
+from copy import copy
+from itertools import zip_longest
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, NamedStyle
 from openpyxl.utils import get_column_letter
 from openpyxl.formatting.rule import CellIsRule
 import logging
+import inventory_store
+import item_categories
 
 # ------------------- Configuration -------------------
 INPUT_CSV = os.path.join('output', 'processed_inventory.csv')
+INPUT_PARQUET = os.path.join('output', 'processed_inventory.parquet')  # Read instead of the CSV when up to date
+INPUT_DB = None  # Inventory store (see inventory_store.py) to report on instead of the CSV; None disables it
 OUTPUT_EXCEL = os.path.join('output', 'processed_inventory.xlsx')
 LOG_FILE = "excel_generation.log"
 
 # -----------------------------------------------------
 
+# ------------------- Report Layout -------------------
+CATEGORIES = item_categories.CATEGORIES
+RARITIES = ['Rare', 'Epic']
+RARITY_COLORS = {'Rare': '0070dd', 'Epic': 'a335ee'}  # Blue, purple
+
+ITEM_COLUMNS = ['Matched Items', 'Matched Traits', 'Type', 'Price', 'Ratio']
+ITEM_COLUMN_WIDTHS = {
+    'Matched Items': 50,
+    'Matched Traits': 20,
+    'Type': 15,
+    'Price': 8,
+    'Ratio': 8
+}
+# Inventory columns the item tables are written from (Ratio is a formula over Price)
+ITEM_DATA_COLUMNS = ['Matched Items', 'Matched Traits', 'Type', 'Price', 'Extracts Needed']
+COUNTS_COLUMNS = ['Type', 'Matched Traits', 'Count']
+COUNTS_COLUMN_WIDTHS = {
+    'Type': 30,
+    'Matched Traits': 25,
+    'Count': 10
+}
+
+START_ROW = 3  # Starting after a few blank rows
+START_COL = 1  # Column A
+# Rare tables start in START_COL, Epic tables to their right after an extra column space
+TABLE_START_COLS = {'Rare': START_COL, 'Epic': START_COL + len(ITEM_COLUMNS) + 2}
+
+# Ratio conditional formatting: green for Ratio >= 5, yellow for 1.0 <= Ratio < 5, red for Ratio < 1.0
+RATIO_RULES = [
+    ('greaterThanOrEqual', ['5'], 'C6EFCE'),
+    ('between', ['1', '4.99'], 'FFEB9C'),
+    ('lessThan', ['1'], 'FFC7CE'),
+]
+# -----------------------------------------------------
+
 # ------------------- Logging Setup -------------------
 logging.basicConfig(
     level=logging.INFO,
@@ -34,257 +79,221 @@ def get_extracts_needed(rarity):
     else:
         return 0
 
-def get_types_for_category(category):
-    if category == 'Weapon':
-        return ["Dagger", "Staff", "Bow", "Sword", "Wand", "Crossbow", "Greatsword"]
-    elif category == 'Armor':
-        return ["Armor", "Helmet", "Shield", "Chest", "Boots", "Head", "Legs", "Feet", "Hands", "Cloak", "Gloves", "Pants", "Robes", "Tunic", "Greaves", "Gauntlets", "Plate", "Mail", "Mask", "Vestment", "Hat", "Shoes", "Cap", "Mantle", "Visor", "Circlet", "Hood", "Sabatons"]
-    elif category == 'Accessory':
-        return ["Belt", "Ring", "Bracelet", "Necklace", "Earring", "Amulet", "Pendant", "Charm", "Wristlet", "Bangle", "Collar", "Choker", "Torque"]
-    else:
-        return ['Unknown']
-
-def generate_excel():
+def category_column(types):
+    """
+    Categorical of each row's report category from the Type categorical, classifying every
+    distinct Type once. Rows without a Type get no category.
+    """
+    lookup = item_categories.category_lookup(types.categories)
+    # Category code per Type code; the trailing -1 is picked up by the -1 code of missing types
+    codes = np.array([CATEGORIES.index(lookup[type_text]) for type_text in types.categories] + [-1])
+    return pd.Categorical.from_codes(codes[types.codes], categories=CATEGORIES)
+
+def aggregate(df):
+    """
+    Compute every category x rarity item table and trait counts table in one grouping pass.
+    Returns {category: {rarity: (items_df, counts_df)}} for the categories with any rows;
+    the sheets are written from these without scanning the inventory again.
+    """
+    types = pd.Categorical(df['Type'])
+    categories = category_column(types)
+    # Other rarities aren't reported; they become missing before the Categorical is built
+    rarities = pd.Categorical(df['Rarity'].where(df['Rarity'].isin(RARITIES)), categories=RARITIES)
+    keys = [pd.Series(categories, index=df.index, name='Category'), pd.Series(rarities, index=df.index, name='Rarity')]
+
+    item_positions = df.groupby(keys, observed=True).indices
+    counts = (df.groupby(keys + [pd.Series(types, index=df.index, name='Type'), df['Matched Traits']], observed=True)
+              .size().reset_index(name='Count'))
+    counts_by_key = {key: table[COUNTS_COLUMNS].reset_index(drop=True)
+                     for key, table in counts.groupby(['Category', 'Rarity'], observed=True)}
+
+    items = df[ITEM_DATA_COLUMNS]
+    empty_items, empty_counts = items.iloc[:0], pd.DataFrame(columns=COUNTS_COLUMNS)
+    report = {}
+    for category in pd.unique(categories.dropna()):
+        report[category] = {
+            rarity: (items.take(item_positions[(category, rarity)]) if (category, rarity) in item_positions else empty_items,
+                     counts_by_key.get((category, rarity), empty_counts))
+            for rarity in RARITIES
+        }
+    return report
+
+def register_styles(workbook):
+    """
+    Register the report's cell styles once per workbook; cells then refer to them by name.
+    """
+    label_font = Font(color='FFFFFF', bold=True, size=10)  # White text, bold, size 10
+    styles = [NamedStyle(name='header', font=Font(bold=True, size=10)),
+              NamedStyle(name='data', font=Font(size=10))]
+    for rarity, color in RARITY_COLORS.items():
+        styles.append(NamedStyle(name=f'{rarity}_label', font=label_font,
+                                 fill=PatternFill(start_color=color, end_color=color, fill_type='solid')))
+        styles.append(NamedStyle(name=f'{rarity}_item', font=Font(color=color, bold=True, size=10)))
+    for style in styles:
+        workbook.add_named_style(style)
+
+def cell_factory(worksheet):
+    """
+    Return make_cell(value, style) for a write-only sheet. Each named style is resolved once
+    on a prototype cell and its style array is copied into every new cell, instead of
+    looking the named style up again for each value.
+    """
+    prototypes = {}
+    for style in ['header', 'data'] + [f'{rarity}_{kind}' for rarity in RARITY_COLORS for kind in ('label', 'item')]:
+        prototypes[style] = WriteOnlyCell(worksheet)
+        prototypes[style].style = style
+
+    def make_cell(value, style):
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell._style = copy(prototypes[style]._style)
+        return cell
+    return make_cell
+
+def item_table_rows(make_cell, items_df, rarity):
+    """
+    Yield the label, header and data rows of one rarity's item table, each as a list of
+    cells for the table's own columns.
+    """
+    if items_df.empty:
+        return
+    yield [make_cell(f'{rarity} Items', f'{rarity}_label')]
+    yield [make_cell(col_name, 'header') for col_name in ITEM_COLUMNS]
+    price_col_letter = get_column_letter(TABLE_START_COLS[rarity] + ITEM_COLUMNS.index('Price'))
+    columns = [items_df[col_name].tolist() for col_name in ITEM_DATA_COLUMNS]
+    for row_idx, (item, trait, item_type, price, extracts_needed) in enumerate(zip(*columns), start=START_ROW + 2):
+        price_cell = f'{price_col_letter}{row_idx}'
+        yield [make_cell(item, f'{rarity}_item'),
+               make_cell(trait, 'data'),
+               make_cell(item_type, 'data'),
+               make_cell(price, 'data'),
+               make_cell(f'=IF({price_cell}>0,{price_cell}/{extracts_needed},"")', 'data')]
+
+def counts_table_rows(make_cell, counts_df, rarity):
+    """
+    Yield the label, header and data rows of one rarity's trait counts table.
+    """
+    if counts_df.empty:
+        return
+    yield [make_cell(f'{rarity} Traits', f'{rarity}_label')]
+    yield [make_cell(col_name, 'header') for col_name in COUNTS_COLUMNS]
+    for values in zip(*(counts_df[col_name].tolist() for col_name in COUNTS_COLUMNS)):
+        yield [make_cell(value, 'data') for value in values]
+
+def side_by_side(worksheet, tables):
+    """
+    Append the rows of the Rare and Epic tables next to each other, one sheet row at a time.
+    Returns the number of rows appended.
+    """
+    row_count = 0
+    for segments in zip_longest(*tables.values()):
+        row = []
+        for rarity, segment in zip(tables, segments):
+            if segment:
+                row.extend([None] * (TABLE_START_COLS[rarity] - 1 - len(row)))
+                row.extend(segment)
+        worksheet.append(row)
+        row_count += 1
+    return row_count
+
+def add_ratio_formatting(worksheet, rarity, row_count):
+    ratio_col_letter = get_column_letter(TABLE_START_COLS[rarity] + ITEM_COLUMNS.index('Ratio'))
+    ratio_data_start_row = START_ROW + 2
+    ratio_data_end_row = ratio_data_start_row + row_count - 1
+    ratio_range = f'{ratio_col_letter}{ratio_data_start_row}:{ratio_col_letter}{ratio_data_end_row}'
+    for operator, formula, color in RATIO_RULES:
+        worksheet.conditional_formatting.add(ratio_range,
+            CellIsRule(operator=operator, formula=formula, fill=PatternFill(start_color=color, end_color=color, fill_type='solid')))
+
+def set_column_widths(worksheet, columns, widths, first_col):
+    for i, col_name in enumerate(columns):
+        if col_name in widths:
+            worksheet.column_dimensions[get_column_letter(first_col + i)].width = widths[col_name]
+
+def write_category_sheet(workbook, category, tables):
+    """
+    Stream one category's Rare/Epic item tables and trait counts, as computed by aggregate(),
+    into a write-only sheet.
+    """
+    worksheet = workbook.create_sheet(category)
+    make_cell = cell_factory(worksheet)
+    items = {rarity: items_df for rarity, (items_df, _) in tables.items()}
+    counts = {rarity: counts_df for rarity, (_, counts_df) in tables.items()}
+
+    # Column widths have to be known before the first row is streamed; the counts widths
+    # take over the columns they share with the item table
+    for rarity in RARITIES:
+        if not items[rarity].empty:
+            set_column_widths(worksheet, ITEM_COLUMNS, ITEM_COLUMN_WIDTHS, TABLE_START_COLS[rarity])
+        if not counts[rarity].empty:
+            set_column_widths(worksheet, COUNTS_COLUMNS, COUNTS_COLUMN_WIDTHS, TABLE_START_COLS[rarity])
+
+    for _ in range(START_ROW - 1):
+        worksheet.append([])
+    written_rows = START_ROW - 1 + side_by_side(
+        worksheet, {rarity: item_table_rows(make_cell, items[rarity], rarity) for rarity in RARITIES})
+    for rarity in RARITIES:
+        if not items[rarity].empty:
+            add_ratio_formatting(worksheet, rarity, len(items[rarity]))
+
+    # Leave a space between item tables and trait counts
+    max_row = max(len(items_df) for items_df in items.values()) + START_ROW + 2
+    counts_start_row = max_row + 2
+    for _ in range(counts_start_row - 1 - written_rows):
+        worksheet.append([])
+    side_by_side(worksheet, {rarity: counts_table_rows(make_cell, counts[rarity], rarity) for rarity in RARITIES})
+
+def load_inventory():
+    """
+    Load the processed inventory, from INPUT_DB when set, otherwise preferring the typed
+    Parquet copy unless the CSV was written after it (e.g. rows appended by main.py's watch
+    mode). Returns None if there is nothing to load.
+    """
+    if INPUT_DB:
+        if not os.path.exists(INPUT_DB):
+            logging.error(f"Inventory store does not exist: {INPUT_DB}")
+            return None
+        return inventory_store.load_dataframe(INPUT_DB)
+    if os.path.exists(INPUT_PARQUET) and (not os.path.exists(INPUT_CSV)
+                                          or os.path.getmtime(INPUT_PARQUET) >= os.path.getmtime(INPUT_CSV)):
+        try:
+            return pd.read_parquet(INPUT_PARQUET)
+        except Exception as e:
+            logging.warning(f"Failed to read {INPUT_PARQUET}, falling back to the CSV: {e}")
     if not os.path.exists(INPUT_CSV):
         logging.error(f"Input CSV file does not exist: {INPUT_CSV}")
-        return
+        return None
+    return pd.read_csv(INPUT_CSV)
 
-    df = pd.read_csv(INPUT_CSV)
+def generate_excel():
+    df = load_inventory()
+    if df is None:
+        return
 
     # Calculate Lucent Price and Extracts Needed
     df['Price'] = 0  # Initialize Price to 0
     df['Extracts Needed'] = df['Rarity'].apply(get_extracts_needed)
     df = df.drop(columns=['Lucent Price', 'Lucent/Extract Ratio'], errors='ignore')
 
-    categories = ['Weapon', 'Armor', 'Accessory', 'Misc']
-    with pd.ExcelWriter(OUTPUT_EXCEL, engine='openpyxl') as writer:
-        workbook = writer.book
-
-        for category in categories:
-            category_types = get_types_for_category(category)
-            category_df = df[df['Type'].isin(category_types)]
-            if category_df.empty:
-                continue
-
-            sheet_name = category
-            worksheet = workbook.create_sheet(sheet_name)
-
-            rare_df = category_df[category_df['Rarity'] == 'Rare'].reset_index(drop=True)
-            epic_df = category_df[category_df['Rarity'] == 'Epic'].reset_index(drop=True)
-
-            # Define fills and fonts
-            rare_label_fill = PatternFill(start_color='0070dd', end_color='0070dd', fill_type='solid')  # Blue
-            epic_label_fill = PatternFill(start_color='a335ee', end_color='a335ee', fill_type='solid')  # Purple
-            label_font = Font(color='FFFFFF', bold=True, size=10)  # White text, bold, size 10
-
-            rare_item_font = Font(color='0070dd', bold=True, size=10)
-            epic_item_font = Font(color='a335ee', bold=True, size=10)
-            header_font = Font(bold=True, size=10)
-            data_font = Font(size=10)  # Font for other data cells
-
-            column_widths = {
-                'Matched Items': 50,
-                'Matched Traits': 20,
-                'Type': 15,
-                'Price': 8,
-                'Ratio': 8
-            }
-
-            columns_to_write = ['Matched Items', 'Matched Traits', 'Type', 'Price', 'Ratio']
-
-            start_row = 3  # Starting after a few blank rows
-            start_col = 1  # Column A
-
-            # Write Rare items
-            if not rare_df.empty:
-                # Title for Rare items
-                cell = worksheet.cell(row=start_row, column=start_col, value='Rare Items')
-                cell.fill = rare_label_fill
-                cell.font = label_font
-                # Write headers
-                for i, col_name in enumerate(columns_to_write):
-                    col_idx = start_col + i
-                    cell = worksheet.cell(row=start_row + 1, column=col_idx, value=col_name)
-                    cell.font = header_font
-                # Write data
-                for row_idx, (index, row) in enumerate(rare_df.iterrows(), start=start_row + 2):
-                    extracts_needed = row['Extracts Needed']
-                    for i, col_name in enumerate(columns_to_write):
-                        col_idx = start_col + i
-                        cell = worksheet.cell(row=row_idx, column=col_idx)
-                        if col_name == 'Ratio':
-                            price_col_letter = get_column_letter(start_col + columns_to_write.index('Price'))
-                            price_cell = f'{price_col_letter}{row_idx}'
-                            formula = f'=IF({price_cell}>0,{price_cell}/{extracts_needed},"")'
-                            cell.value = formula
-                            cell.font = data_font
-                        elif col_name == 'Price':
-                            cell.value = row[col_name]
-                            cell.font = data_font
-                        else:
-                            value = row[col_name]
-                            cell.value = value
-                            if col_name == 'Matched Items':
-                                cell.font = rare_item_font
-                            else:
-                                cell.font = data_font
-
-                # Adjust column widths
-                for i, col_name in enumerate(columns_to_write):
-                    col_idx = start_col + i
-                    column_letter = get_column_letter(col_idx)
-                    if col_name in column_widths:
-                        worksheet.column_dimensions[column_letter].width = column_widths[col_name]
-
-                # Apply conditional formatting to Ratio column
-                ratio_col_idx = start_col + columns_to_write.index('Ratio')
-                ratio_col_letter = get_column_letter(ratio_col_idx)
-                ratio_data_start_row = start_row + 2
-                ratio_data_end_row = ratio_data_start_row + len(rare_df) - 1
-                ratio_range = f'{ratio_col_letter}{ratio_data_start_row}:{ratio_col_letter}{ratio_data_end_row}'
-                # Green for Ratio >= 5
-                worksheet.conditional_formatting.add(ratio_range,
-                    CellIsRule(operator='greaterThanOrEqual', formula=['5'], fill=PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')))
-                # Yellow for 1.0 <= Ratio < 5
-                worksheet.conditional_formatting.add(ratio_range,
-                    CellIsRule(operator='between', formula=['1', '4.99'], fill=PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')))
-                # Red for Ratio < 1.0
-                worksheet.conditional_formatting.add(ratio_range,
-                    CellIsRule(operator='lessThan', formula=['1'], fill=PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')))
-
-            # Write Epic items next to Rare items with an extra column space in between
-            if not epic_df.empty:
-                epic_start_col = start_col + len(columns_to_write) + 2  # Additional column space
-                cell = worksheet.cell(row=start_row, column=epic_start_col, value='Epic Items')
-                cell.fill = epic_label_fill
-                cell.font = label_font
-                # Write headers
-                for i, col_name in enumerate(columns_to_write):
-                    col_idx = epic_start_col + i
-                    cell = worksheet.cell(row=start_row + 1, column=col_idx, value=col_name)
-                    cell.font = header_font
-                # Write data
-                for row_idx, (index, row) in enumerate(epic_df.iterrows(), start=start_row + 2):
-                    extracts_needed = row['Extracts Needed']
-                    for i, col_name in enumerate(columns_to_write):
-                        col_idx = epic_start_col + i
-                        cell = worksheet.cell(row=row_idx, column=col_idx)
-                        if col_name == 'Ratio':
-                            price_col_letter = get_column_letter(epic_start_col + columns_to_write.index('Price'))
-                            price_cell = f'{price_col_letter}{row_idx}'
-                            formula = f'=IF({price_cell}>0,{price_cell}/{extracts_needed},"")'
-                            cell.value = formula
-                            cell.font = data_font
-                        elif col_name == 'Price':
-                            cell.value = row[col_name]
-                            cell.font = data_font
-                        else:
-                            value = row[col_name]
-                            cell.value = value
-                            if col_name == 'Matched Items':
-                                cell.font = epic_item_font
-                            else:
-                                cell.font = data_font
-
-                # Adjust column widths
-                for i, col_name in enumerate(columns_to_write):
-                    col_idx = epic_start_col + i
-                    column_letter = get_column_letter(col_idx)
-                    if col_name in column_widths:
-                        worksheet.column_dimensions[column_letter].width = column_widths[col_name]
-
-                # Apply conditional formatting to Ratio column
-                ratio_col_idx = epic_start_col + columns_to_write.index('Ratio')
-                ratio_col_letter = get_column_letter(ratio_col_idx)
-                ratio_data_start_row = start_row + 2
-                ratio_data_end_row = ratio_data_start_row + len(epic_df) - 1
-                ratio_range = f'{ratio_col_letter}{ratio_data_start_row}:{ratio_col_letter}{ratio_data_end_row}'
-                # Green for Ratio >= 5
-                worksheet.conditional_formatting.add(ratio_range,
-                    CellIsRule(operator='greaterThanOrEqual', formula=['5'], fill=PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')))
-                # Yellow for 1.0 <= Ratio < 5
-                worksheet.conditional_formatting.add(ratio_range,
-                    CellIsRule(operator='between', formula=['1', '4.99'], fill=PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')))
-                # Red for Ratio < 1.0
-                worksheet.conditional_formatting.add(ratio_range,
-                    CellIsRule(operator='lessThan', formula=['1'], fill=PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')))
-
-            # Leave a space between item tables and trait counts
-            max_row = max(len(rare_df), len(epic_df)) + start_row + 2
-            counts_start_row = max_row + 2
-
-            counts_column_widths = {
-                'Type': 30,
-                'Matched Traits': 25,
-                'Count': 10
-            }
-
-            rare_trait_counts = rare_df.groupby(['Type', 'Matched Traits']).size().reset_index(name='Count')
-            epic_trait_counts = epic_df.groupby(['Type', 'Matched Traits']).size().reset_index(name='Count')
-
-            counts_columns = ['Type', 'Matched Traits', 'Count']
-
-            # Write Rare trait counts
-            if not rare_trait_counts.empty:
-                cell = worksheet.cell(row=counts_start_row, column=start_col, value='Rare Traits')
-                cell.fill = rare_label_fill
-                cell.font = label_font
-                # Write headers
-                for i, col_name in enumerate(counts_columns):
-                    col_idx = start_col + i
-                    cell = worksheet.cell(row=counts_start_row + 1, column=col_idx, value=col_name)
-                    cell.font = header_font
-                # Write data
-                for row_idx, (index, row) in enumerate(rare_trait_counts.iterrows(), start=counts_start_row + 2):
-                    for i, col_name in enumerate(counts_columns):
-                        col_idx = start_col + i
-                        value = row[col_name]
-                        cell = worksheet.cell(row=row_idx, column=col_idx, value=value)
-                        cell.font = data_font
-                # Adjust column widths
-                for i, col_name in enumerate(counts_columns):
-                    col_idx = start_col + i
-                    column_letter = get_column_letter(col_idx)
-                    if col_name in counts_column_widths:
-                        worksheet.column_dimensions[column_letter].width = counts_column_widths[col_name]
-
-            # Write Epic trait counts
-            if not epic_trait_counts.empty:
-                epic_counts_start_col = epic_start_col
-                cell = worksheet.cell(row=counts_start_row, column=epic_counts_start_col, value='Epic Traits')
-                cell.fill = epic_label_fill
-                cell.font = label_font
-                # Write headers
-                for i, col_name in enumerate(counts_columns):
-                    col_idx = epic_counts_start_col + i
-                    cell = worksheet.cell(row=counts_start_row + 1, column=col_idx, value=col_name)
-                    cell.font = header_font
-                # Write data
-                for row_idx, (index, row) in enumerate(epic_trait_counts.iterrows(), start=counts_start_row + 2):
-                    for i, col_name in enumerate(counts_columns):
-                        col_idx = epic_counts_start_col + i
-                        value = row[col_name]
-                        cell = worksheet.cell(row=row_idx, column=col_idx, value=value)
-                        cell.font = data_font
-                # Adjust column widths
-                for i, col_name in enumerate(counts_columns):
-                    col_idx = epic_counts_start_col + i
-                    column_letter = get_column_letter(col_idx)
-                    if col_name in counts_column_widths:
-                        worksheet.column_dimensions[column_letter].width = counts_column_widths[col_name]
-
-            # Apply font size 10 to all remaining cells (optional if needed)
-            # If you want to ensure that all cells, even empty ones, have font size 10, you can uncomment and adjust the following code:
-            # for row in worksheet.iter_rows():
-            #     for cell in row:
-            #         if cell.font is None or cell.font.size != 10:
-            #             cell.font = Font(size=10)
-
-        # Remove 'Sheet' if it exists (created by default)
-        if 'Sheet' in workbook.sheetnames:
-            del workbook['Sheet']
+    # Write-only workbook: rows are streamed to disk as they are appended, with shared named styles
+    workbook = Workbook(write_only=True)
+    register_styles(workbook)
+    report = aggregate(df)
+    for category in CATEGORIES:
+        if category in report:
+            write_category_sheet(workbook, category, report[category])
 
+    if not workbook.sheetnames:
+        logging.error("No items to write to the Excel report.")
+        return
+    workbook.save(OUTPUT_EXCEL)
     logging.info(f"Data successfully saved to {OUTPUT_EXCEL}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate the Excel report from the processed inventory.")
+    parser.add_argument('--db', nargs='?', const=inventory_store.DEFAULT_DB_PATH, default=None, metavar='PATH',
+                        help="Report on everything in the inventory store instead of the latest run's CSV")
+    return parser.parse_args()
+
 if __name__ == '__main__':
+    INPUT_DB = parse_args().db
     generate_excel()
@@ -0,0 +1,126 @@
+import argparse
+import logging
+import os
+import time
+import sqlite_connections
+
+# ------------------- Configuration -------------------
+# Default store file, used by main.py, capture.py and generate_excel.py
+DEFAULT_DB_PATH = os.path.join('output', 'inventory.sqlite')
+
+# Rows written per transaction
+WRITE_BATCH_SIZE = 1000
+
+# Output row keys (as in processed_inventory.csv) and the store columns they map to
+COLUMNS = {
+    'File': 'file',
+    'Matched Items': 'item',
+    'Type': 'type',
+    'Rarity': 'rarity',
+    'Matched Traits': 'trait',
+}
+
+# -----------------------------------------------------
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS inventory ("
+    " file TEXT PRIMARY KEY,"
+    " item TEXT,"
+    " type TEXT,"
+    " rarity TEXT,"
+    " trait TEXT,"
+    " first_seen REAL NOT NULL,"
+    " updated REAL NOT NULL)",
+] + [f"CREATE INDEX IF NOT EXISTS idx_inventory_{column} ON inventory ({column})"
+     for column in ('item', 'type', 'rarity', 'trait')]
+
+
+def _connect(path):
+    return sqlite_connections.connect(path, SCHEMA)
+
+
+def upsert_rows(path, rows):
+    """
+    Insert output rows, replacing the stored row with the same File. Empty values are stored as NULL.
+    """
+    connection = _connect(path)
+    now = time.time()
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        batch = [tuple(row.get(key) or None for key in COLUMNS) + (now, now)
+                 for row in rows[start:start + WRITE_BATCH_SIZE]]
+        with connection:
+            connection.executemany(
+                "INSERT INTO inventory (file, item, type, rarity, trait, first_seen, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (file) DO UPDATE SET item = excluded.item, type = excluded.type,"
+                " rarity = excluded.rarity, trait = excluded.trait, updated = excluded.updated",
+                batch
+            )
+    logging.info(f"Stored {len(rows)} rows in the inventory at {path}")
+
+
+def build_query(item=None, item_type=None, rarity=None, trait=None):
+    """
+    Return (sql, parameters) selecting the stored rows, with the output column names, that
+    match every filter given. Each filter is an exact, indexed match.
+    """
+    selected = ', '.join(f'{column} AS "{key}"' for key, column in COLUMNS.items())
+    filters = {'item': item, 'type': item_type, 'rarity': rarity, 'trait': trait}
+    conditions = [f"{column} = ?" for column, value in filters.items() if value is not None]
+    sql = f"SELECT {selected} FROM inventory"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql + " ORDER BY file", [value for value in filters.values() if value is not None]
+
+
+def query(path, item=None, item_type=None, rarity=None, trait=None):
+    """
+    Return the matching rows as dicts keyed like processed_inventory.csv.
+    """
+    sql, parameters = build_query(item, item_type, rarity, trait)
+    cursor = _connect(path).execute(sql, parameters)
+    keys = [description[0] for description in cursor.description]
+    return [dict(zip(keys, row)) for row in cursor]
+
+
+def load_dataframe(path, item=None, item_type=None, rarity=None, trait=None):
+    """
+    Return the matching rows as a DataFrame with the processed_inventory.csv columns.
+    """
+    import pandas as pd
+    sql, parameters = build_query(item, item_type, rarity, trait)
+    return pd.read_sql_query(sql, _connect(path), params=parameters)
+
+
+def import_csv(path, csv_path):
+    """
+    Upsert every row of an existing processed_inventory.csv.
+    """
+    import csv
+    with open(csv_path, "r", encoding="utf-8", newline="") as file:
+        rows = list(csv.DictReader(file))
+    upsert_rows(path, rows)
+    return len(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Query the inventory store.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Inventory store file")
+    parser.add_argument('--item', help="Exact item name")
+    parser.add_argument('--type', dest='item_type', help="Item type, e.g. Dagger")
+    parser.add_argument('--rarity', help="Rarity, e.g. Epic")
+    parser.add_argument('--trait', help="Trait, e.g. 'Attack Speed'")
+    parser.add_argument('--import-csv', metavar='CSV', help="Add the rows of a processed_inventory.csv to the store")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    args = parse_args()
+    if args.import_csv:
+        import_csv(args.db, args.import_csv)
+    else:
+        results = query(args.db, args.item, args.item_type, args.rarity, args.trait)
+        for row in results:
+            print(', '.join(str(row[key]) if row[key] is not None else '' for key in COLUMNS))
+        print(f"{len(results)} rows")
@@ -0,0 +1,45 @@
+import re
+from functools import lru_cache
+
+# ------------------- Configuration -------------------
+
+# Keywords found in each category's item type text, in priority order: a type matching
+# keywords of several categories ("Ring Mail") belongs to the first one listed
+CATEGORY_KEYWORDS = {
+    'Weapon': ["Dagger", "Staff", "Bow", "Sword", "Wand", "Crossbow", "Greatsword"],
+    'Armor': ["Armor", "Helmet", "Shield", "Chest", "Boots", "Head", "Legs", "Feet", "Hands", "Cloak", "Gloves",
+              "Pants", "Robes", "Tunic", "Greaves", "Gauntlets", "Plate", "Mail", "Mask", "Vestment", "Hat", "Shoes",
+              "Cap", "Mantle", "Visor", "Circlet", "Hood", "Sabatons"],
+    'Accessory': ["Belt", "Ring", "Bracelet", "Necklace", "Earring", "Amulet", "Pendant", "Charm", "Wristlet",
+                  "Bangle", "Collar", "Choker", "Torque"],
+}
+
+# Category of types that match no keywords (including 'Unknown')
+MISC_CATEGORY = 'Misc'
+
+CATEGORIES = list(CATEGORY_KEYWORDS) + [MISC_CATEGORY]
+
+# -----------------------------------------------------
+
+# One case-insensitive matcher for all categories: an alternative per category, in priority
+# order, looks ahead for any of its keywords and names the category through its group
+_pattern = re.compile('|'.join(
+    f"(?=.*(?:{'|'.join(re.escape(keyword) for keyword in keywords)}))(?P<{category}>)"
+    for category, keywords in CATEGORY_KEYWORDS.items()
+), re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=1024)
+def classify(type_text):
+    """
+    Return the category whose keywords appear in the type text, or None if none do.
+    """
+    match = _pattern.match(type_text)
+    return match.lastgroup if match else None
+
+
+def category_lookup(types):
+    """
+    Map each distinct type to its category, MISC_CATEGORY when it matches no keywords.
+    """
+    return {type_text: classify(type_text) or MISC_CATEGORY for type_text in types}
@@ -1,32 +1,124 @@
 import os
-import pytesseract
+import argparse
 from PIL import Image
 import cv2
 import csv
 import logging
 import re
-import pandas as pd
+import json
+import time
+import queue
+import itertools
+import threading
+import importlib.util
+from collections import Counter
+from functools import partial, lru_cache
 from rapidfuzz import process, fuzz
 import numpy as np
-import easyocr
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import crop_screenshot
+import ocr_cache
+import match_index
+import fingerprint_index
+import catalog_artifact
+import metrics
+import inventory_store
 
 # ------------------- Configuration -------------------
 
 # Path to Tesseract executable
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # For Windows
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # For Windows
 
-# Number of threads for parallel processing
+# Tesseract backend: 'tesserocr' keeps in-process API handles alive (one set per worker
+# thread), 'pytesseract' runs the tesseract executable for every crop, and 'auto' uses
+# tesserocr when it is installed
+TESSERACT_BACKEND = 'auto'
+TESSERACT_BACKEND_CHOICES = ('auto', 'tesserocr', 'pytesseract')
+TESSDATA_PATH = None  # Folder containing eng.traineddata for tesserocr; None uses its default
+
+# Number of threads (or processes) for parallel processing
 MAX_WORKERS = 4
 
+# Parallel execution mode: 'thread' shares one OCR engine between threads,
+# 'process' gives every worker process its own OCR engine and catalog
+EXECUTOR = 'thread'
+
+# Number of image groups handed to a worker process at a time
+CHUNK_SIZE = 8
+
+# OCR engines to run: 'tesseract', 'easyocr' or 'both'. Engines are only
+# initialized when a run actually calls them.
+ENGINES = 'both'
+ENGINE_CHOICES = ('tesseract', 'easyocr', 'both')
+
+# How extract_text_from_image combines engines: 'best' runs every enabled engine and
+# keeps the higher-confidence result; 'cascade' runs the cheap engine first and only
+# calls the second one when the first result is below CASCADE_CONFIDENCE (0-100)
+# or does not match the catalog
+OCR_MODE = 'best'
+OCR_MODE_CHOICES = ('best', 'cascade')
+CASCADE_ORDER = ('tesseract', 'easyocr')
+CASCADE_CONFIDENCE = 80
+
+# Number of crops sent through EasyOCR in one batched call; 0 processes every crop on its own.
+# With the process executor, each worker process OCRs whole batches.
+EASYOCR_BATCH_SIZE = 0
+
+# Fuzzy matching: minimum token_sort_ratio score for a match, and how many distinct
+# OCR strings keep their match result memoized
+MATCH_SCORE_CUTOFF = 80
+MATCH_CACHE_SIZE = 4096
+
+# Bulk matching: worker threads for rapidfuzz's score matrix (-1 uses every core) and
+# number of queries scored per matrix, which bounds its memory
+MATCH_WORKERS = -1
+MATCH_BLOCK_SIZE = 2048
+
+# Recognize title crops against rendered catalog names before running OCR; crops that
+# don't match confidently enough still go through extract_text_from_image
+TITLE_TEMPLATES = False
+
+# Learned index of perceptual hashes of confirmed crops, looked up before OCR (None disables
+# it). An OCR result is added when it matches the catalog exactly or with at least this score.
+FINGERPRINT_INDEX_PATH = None
+FINGERPRINT_MIN_SCORE = 95
+
+# Watch mode: seconds between folder checks, and how long a new screenshot's size and
+# modification time must stay unchanged before it is treated as fully written
+WATCH_POLL_INTERVAL = 0.5
+WATCH_SETTLE_SECONDS = 1.0
+
+# Also write the output as Parquet (needs pyarrow), with these columns dictionary-encoded
+WRITE_PARQUET = False
+CATEGORICAL_COLUMNS = ['Type', 'Rarity', 'Matched Traits']
+
+# SQLite inventory store that every saved row is also upserted into; None disables it
+INVENTORY_DB_PATH = None
+
+# Folder that per-stage timings, counters and queue depths are written to at the end of a run
+# (metrics.json and metrics.prom); None leaves the instrumentation switched off
+METRICS_FOLDER = None
+
+# Module settings copied into every worker process
+WORKER_SETTINGS = ('ENGINES', 'OCR_MODE', 'CASCADE_CONFIDENCE', 'TESSERACT_BACKEND', 'TESSDATA_PATH',
+                   'OCR_CACHE_PATH', 'TITLE_TEMPLATES', 'FINGERPRINT_INDEX_PATH', 'CATALOG_ARTIFACT_FOLDER',
+                   'METRICS_FOLDER')
+
 # File paths
 WEAPONS_CSV = "weapons.csv"
 ARMOR_CSV = "armor.csv"
 ACCESSORIES_CSV = "accessories.csv"  # New line for accessories
 TRAITS_CSV = "traits.csv"
 CROPPED_FOLDER = 'cropped_screenshots/'
+SCREENSHOT_FOLDER = 'screenshots/'
+TEMPLATES_FOLDER = 'templates/'
 OUTPUT_FOLDER = 'output/'
 OUTPUT_CSV = os.path.join(OUTPUT_FOLDER, 'processed_inventory.csv')
+OUTPUT_PARQUET = os.path.join(OUTPUT_FOLDER, 'processed_inventory.parquet')
+OCR_CACHE_PATH = os.path.join(OUTPUT_FOLDER, 'ocr_cache.sqlite')  # Persistent OCR result cache; None disables it
+MANIFEST_PATH = os.path.join(OUTPUT_FOLDER, 'manifest.json')  # Processed inputs for incremental runs
+CATALOG_ARTIFACT_FOLDER = os.path.join(OUTPUT_FOLDER, 'catalog')  # Compiled catalogs; None parses the CSVs every time
+DEFAULT_FINGERPRINT_INDEX_PATH = os.path.join(OUTPUT_FOLDER, 'fingerprints.sqlite')
 LOG_FILE = "app.log"
 
 # -----------------------------------------------------
@@ -43,10 +135,128 @@ logging.basicConfig(
 # -----------------------------------------------------
 
 # ------------------- OCR Engine Setup -------------------
-easy_reader = easyocr.Reader(['en'])  # Initialize EasyOCR with English
+# EasyOCR pulls in torch and loads its models, so the reader is only built on first use
+easy_reader = None
+_engine_lock = threading.Lock()
+
+
+def get_pytesseract():
+    # pytesseract imports pandas on load, so defer it until Tesseract is actually used
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return pytesseract
+
+
+def use_tesserocr():
+    if TESSERACT_BACKEND == 'auto':
+        return importlib.util.find_spec('tesserocr') is not None
+    return TESSERACT_BACKEND == 'tesserocr'
+
+
+# tesserocr API handles are not thread-safe, so every thread keeps its own title (PSM 7)
+# and trait (PSM 6) handles, configured once and reused for every crop
+_tesseract_local = threading.local()
+_tesseract_pool = None
+
+
+def get_tesseract_api(image_type='title'):
+    apis = getattr(_tesseract_local, 'apis', None)
+    if apis is None:
+        import tesserocr
+        options = {'path': TESSDATA_PATH} if TESSDATA_PATH else {}
+        apis = {
+            'title': tesserocr.PyTessBaseAPI(lang='eng', psm=tesserocr.PSM.SINGLE_LINE, **options),
+            'trait': tesserocr.PyTessBaseAPI(lang='eng', psm=tesserocr.PSM.SINGLE_BLOCK, **options),
+        }
+        _tesseract_local.apis = apis
+    return apis['title' if image_type == 'title' else 'trait']
+
+
+def get_tesseract_pool():
+    # Long-lived threads for batched Tesseract calls, so their API handles stay warm between batches
+    global _tesseract_pool
+    if _tesseract_pool is None:
+        with _engine_lock:
+            if _tesseract_pool is None:
+                _tesseract_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    return _tesseract_pool
+
+
+def get_easy_reader():
+    global easy_reader
+    if easy_reader is None:
+        with _engine_lock:
+            if easy_reader is None:
+                import easyocr
+                easy_reader = easyocr.Reader(['en'])  # Initialize EasyOCR with English
+    return easy_reader
+
+
+def set_engines(engines):
+    global ENGINES
+    if engines not in ENGINE_CHOICES:
+        raise ValueError(f"Unknown OCR engines '{engines}', expected one of {ENGINE_CHOICES}")
+    ENGINES = engines
+
+
+def engine_enabled(engine):
+    return ENGINES in (engine, 'both')
 # ---------------------------------------------------------
 
 
+# ------------------- Run Counters -------------------
+# Per-run counters (e.g. how often the OCR cascade fell back to the second engine)
+ocr_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def increment_counter(name, amount=1):
+    with _counters_lock:
+        ocr_counters[name] += amount
+
+
+def drain_counters():
+    # Return the counters collected so far and reset them
+    with _counters_lock:
+        counters = dict(ocr_counters)
+        ocr_counters.clear()
+    return counters
+
+
+def log_counters():
+    counters = dict(ocr_counters)
+    recognized = counters.get('title_template_hit', 0)
+    attempts = recognized + counters.get('title_template_miss', 0)
+    if attempts:
+        logging.info(f"Title templates: {recognized} of {attempts} titles recognized without OCR")
+    fingerprint_hits = counters.get('fingerprint_hit', 0)
+    fingerprint_lookups = fingerprint_hits + counters.get('fingerprint_miss', 0)
+    if fingerprint_lookups:
+        logging.info(f"Fingerprint index: {fingerprint_hits} of {fingerprint_lookups} crops recognized without OCR")
+    lookups = counters.get('ocr_cache_hit', 0) + counters.get('ocr_cache_miss', 0)
+    if lookups:
+        logging.info(f"OCR cache: {counters.get('ocr_cache_hit', 0)} hits out of {lookups} lookups")
+    for image_type in ('title', 'trait'):
+        crops = counters.get(f'cascade_{image_type}', 0)
+        if crops:
+            fallbacks = counters.get(f'cascade_{image_type}_fallback', 0)
+            logging.info(f"OCR cascade ({image_type}): fallback engine ran for {fallbacks} of {crops} crops "
+                         f"({100 * fallbacks / crops:.1f}%)")
+    logging.debug(f"Run counters: {counters}")
+
+
+def write_metrics():
+    # Export the stage timings together with the run counters
+    if not METRICS_FOLDER:
+        return
+    try:
+        json_path, prometheus_path = metrics.write_reports(METRICS_FOLDER, ocr_counters)
+        logging.info(f"Metrics written to {json_path} and {prometheus_path}")
+    except OSError as e:
+        logging.error(f"Failed to write metrics: {e}")
+# ----------------------------------------------------
+
+
 # ------------------- Text Normalization -------------------
 def normalize_text(text):
     # Minimal normalization to preserve item names
@@ -116,17 +326,94 @@ def load_traits(file_path):
 
 
 # ------------------- Load Data -------------------
-weapons_items, weapons_normalized = load_items_with_rarity(WEAPONS_CSV)
-armor_items, armor_normalized = load_items_with_rarity(ARMOR_CSV)
-accessories_items, accessories_normalized = load_items_with_rarity(ACCESSORIES_CSV)  # Load accessories
-known_items = {**weapons_items, **armor_items, **accessories_items}
-normalized_items = {**weapons_normalized, **armor_normalized, **accessories_normalized}
-traits, normalized_traits = load_traits(TRAITS_CSV)
-normalized_traits_set = set(normalized_traits)
-
-# Create a list of all possible item names for matching
-item_names = list(known_items.keys())
-normalized_item_names = list(normalized_items.keys())
+# The catalogs are parsed on first use by the matching functions
+known_items = normalized_items = traits = normalized_traits = normalized_traits_set = None
+item_names = normalized_item_names = None
+item_match_index = trait_match_index = None
+trait_names_by_normalized = None
+_catalog_lock = threading.Lock()
+
+# Bump when build_catalog changes, so compiled catalogs from older code are rebuilt
+CATALOG_VERSION = 1
+
+
+def build_catalog():
+    # Parse the catalog CSVs into the matching structures, returned by global name
+    weapons_items, weapons_normalized = load_items_with_rarity(WEAPONS_CSV)
+    armor_items, armor_normalized = load_items_with_rarity(ARMOR_CSV)
+    accessories_items, accessories_normalized = load_items_with_rarity(ACCESSORIES_CSV)  # Load accessories
+    known_items = {**weapons_items, **armor_items, **accessories_items}
+    normalized_items = {**weapons_normalized, **armor_normalized, **accessories_normalized}
+    traits, normalized_traits = load_traits(TRAITS_CSV)
+    normalized_traits_set = set(normalized_traits)
+
+    # traits.csv lists a few traits twice; the first spelling wins, as with list.index
+    trait_names_by_normalized = {}
+    for trait, normalized_trait in zip(traits, normalized_traits):
+        trait_names_by_normalized.setdefault(normalized_trait, trait)
+
+    # Create a list of all possible item names for matching
+    item_names = list(known_items.keys())
+    normalized_item_names = list(normalized_items.keys())
+
+    # Candidate indexes that narrow fuzzy matching down before scoring
+    item_match_index = match_index.build_candidate_index(normalized_item_names)
+    trait_match_index = match_index.build_candidate_index(normalized_traits)
+    return {
+        'known_items': known_items, 'normalized_items': normalized_items,
+        'traits': traits, 'normalized_traits': normalized_traits, 'normalized_traits_set': normalized_traits_set,
+        'trait_names_by_normalized': trait_names_by_normalized,
+        'item_names': item_names, 'normalized_item_names': normalized_item_names,
+        'item_match_index': item_match_index, 'trait_match_index': trait_match_index,
+    }
+
+
+def load_catalogs():
+    # Load the compiled catalog, rebuilding it from the CSVs when one of them has changed
+    if CATALOG_ARTIFACT_FOLDER:
+        catalog = catalog_artifact.load_or_build(CATALOG_ARTIFACT_FOLDER,
+                                                 [WEAPONS_CSV, ARMOR_CSV, ACCESSORIES_CSV, TRAITS_CSV],
+                                                 CATALOG_VERSION, build_catalog)
+    else:
+        catalog = build_catalog()
+    globals().update(catalog)
+    match_item_text.cache_clear()
+    match_trait_text.cache_clear()
+
+
+def ensure_catalogs():
+    if known_items is None:
+        with _catalog_lock:
+            if known_items is None:
+                load_catalogs()
+
+
+_title_templates = None
+
+
+def get_title_templates():
+    # Rendered once per process from the item catalog
+    global _title_templates
+    if _title_templates is None:
+        ensure_catalogs()
+        with _catalog_lock:
+            if _title_templates is None:
+                import title_templates
+                _title_templates = title_templates.TitleTemplates(item_names)
+    return _title_templates
+
+
+_fingerprints = None
+
+
+def get_fingerprints():
+    # Opened once per process; every worker reads the same index file
+    global _fingerprints
+    if _fingerprints is None:
+        with _catalog_lock:
+            if _fingerprints is None:
+                _fingerprints = fingerprint_index.FingerprintIndex(FINGERPRINT_INDEX_PATH)
+    return _fingerprints
 # -----------------------------------------------------
 
 
@@ -139,6 +426,11 @@ def clean_ocr_text(text):
 
 
 # ------------------- Image Preprocessing -------------------
+# Bump when preprocess_image changes so cached OCR results from older runs are not reused
+PREPROCESS_VERSION = 1
+
+
+@metrics.timed('preprocess')
 def preprocess_image(img):
     try:
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -164,10 +456,14 @@ def extract_text_with_tesseract(image, image_type='title'):
     processed_img = preprocess_image(image)
     if processed_img is None:
         return "", 0
+    if use_tesserocr():
+        return extract_text_with_tesserocr(processed_img, image_type)
     pil_img = Image.fromarray(processed_img)
     config = '--psm 7 -l eng' if image_type == 'title' else '--psm 6 -l eng'
     try:
-        data = pytesseract.image_to_data(pil_img, config=config, output_type=pytesseract.Output.DICT)
+        pytesseract = get_pytesseract()
+        with metrics.timer('tesseract'):
+            data = pytesseract.image_to_data(pil_img, config=config, output_type=pytesseract.Output.DICT)
         text = " ".join([word for word in data['text'] if word.strip() != ""])
         conf_list = [int(c) for c in data['conf'] if str(c).isdigit() and int(c) > 0]
         if conf_list:
@@ -182,6 +478,28 @@ def extract_text_with_tesseract(image, image_type='title'):
         return "", 0
 
 
+@metrics.timed('tesseract')
+def extract_text_with_tesserocr(processed_img, image_type='title'):
+    # Same (text, confidence) result as the pytesseract path, without spawning tesseract
+    try:
+        api = get_tesseract_api(image_type)
+        processed_img = np.ascontiguousarray(processed_img)
+        height, width = processed_img.shape[:2]
+        api.SetImageBytes(processed_img.tobytes(), width, height, 1, width)
+        text = " ".join(api.GetUTF8Text().split())
+        conf_list = [c for c in api.AllWordConfidences() if c > 0]
+        if conf_list:
+            conf = np.mean(conf_list)  # Average confidence
+        else:
+            conf = 0
+        text = clean_ocr_text(text)
+        logging.debug(f"Tesseract OCR text ({image_type}): '{text}' with confidence {conf}")
+        return text.strip(), conf
+    except Exception as e:
+        logging.error(f"Tesseract OCR failed for {image_type}: {e}")
+        return "", 0
+
+
 def extract_text_with_easyocr_func(image, image_type='title'):
     processed_img = preprocess_image(image)
     if processed_img is None:
@@ -189,22 +507,159 @@ def extract_text_with_easyocr_func(image, image_type='title'):
     try:
         # EasyOCR expects RGB images
         rgb_img = cv2.cvtColor(processed_img, cv2.COLOR_GRAY2RGB)
-        result = easy_reader.readtext(rgb_img)
-        text = " ".join([res[1] for res in result])
-        conf = np.mean([res[2] for res in result]) if result else 0
-        text = clean_ocr_text(text)
-        logging.debug(f"EasyOCR text ({image_type}): '{text}' with confidence {conf}")
-        return text.strip(), conf
+        with metrics.timer('easyocr'):
+            result = get_easy_reader().readtext(rgb_img)
+        return parse_easyocr_result(result, image_type)
     except Exception as e:
         logging.error(f"EasyOCR failed for {image_type}: {e}")
         return "", 0
 
 
-def extract_text_from_image(image, image_type='title'):
-    # Use both OCR engines and choose the result with higher confidence
-    tesseract_text, tesseract_conf = extract_text_with_tesseract(image, image_type)
-    easyocr_text, easyocr_conf = extract_text_with_easyocr_func(image, image_type)
+def parse_easyocr_result(result, image_type='title'):
+    text = " ".join([res[1] for res in result])
+    conf = np.mean([res[2] for res in result]) if result else 0
+    text = clean_ocr_text(text)
+    logging.debug(f"EasyOCR text ({image_type}): '{text}' with confidence {conf}")
+    return text.strip(), conf
+
+
+def extract_text_with_easyocr_batch(images, image_type='title', batch_size=None):
+    # Run EasyOCR over many crops with one readtext_batched call per batch instead of one call per crop
+    batch_size = batch_size or EASYOCR_BATCH_SIZE or len(images)
+    results = [("", 0)] * len(images)
+
+    # readtext_batched stacks its inputs, so crops are grouped by shape (normally they are all 400x75)
+    by_shape = {}
+    for index, image in enumerate(images):
+        processed_img = preprocess_image(image)
+        if processed_img is not None:
+            rgb_img = cv2.cvtColor(processed_img, cv2.COLOR_GRAY2RGB)
+            by_shape.setdefault(rgb_img.shape, []).append((index, rgb_img))
+
+    for entries in by_shape.values():
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            try:
+                with metrics.timer('easyocr_batch'):
+                    batch_results = get_easy_reader().readtext_batched([img for _, img in batch], batch_size=len(batch))
+            except Exception as e:
+                logging.error(f"Batched EasyOCR failed for {len(batch)} {image_type} crops: {e}")
+                continue
+            for (index, _), result in zip(batch, batch_results):
+                results[index] = parse_easyocr_result(result, image_type)
+    return results
+
+
+def ocr_config_signature(engine, image_type='title'):
+    # Everything besides the pixels that changes an engine's result
+    if engine == 'tesseract':
+        backend = 'tesserocr' if use_tesserocr() else 'pytesseract'
+        psm = 7 if image_type == 'title' else 6
+        return f"pre{PREPROCESS_VERSION}:{backend}:psm{psm}:eng"
+    return f"pre{PREPROCESS_VERSION}:easyocr:en"
+
 
+def lookup_cached_result(engine, image, image_type='title'):
+    # Returns (cache_key, cached_result); both are None when the cache is disabled
+    if not OCR_CACHE_PATH:
+        return None, None
+    key = ocr_cache.make_key(ocr_cache.hash_image(image), engine, image_type, ocr_config_signature(engine, image_type))
+    cached = ocr_cache.get(OCR_CACHE_PATH, key)
+    increment_counter('ocr_cache_hit' if cached is not None else 'ocr_cache_miss')
+    return key, cached
+
+
+def store_cached_result(key, result):
+    # Empty results are not cached, since engine failures also come back as ("", 0)
+    if key and result[0]:
+        ocr_cache.put(OCR_CACHE_PATH, key, *result)
+
+
+def run_ocr_engine(engine, image, image_type='title'):
+    key, cached = lookup_cached_result(engine, image, image_type)
+    if cached is not None:
+        return cached
+    if engine == 'tesseract':
+        result = extract_text_with_tesseract(image, image_type)
+    else:
+        result = extract_text_with_easyocr_func(image, image_type)
+    store_cached_result(key, result)
+    return result
+
+
+def run_ocr_engine_batch(engine, images, image_type='title'):
+    lookups = [lookup_cached_result(engine, image, image_type) for image in images]
+    results = [cached for _, cached in lookups]
+    pending = [index for index, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    pending_images = [images[index] for index in pending]
+    if engine == 'tesseract':
+        # Tesseract has no batch API; its calls release the GIL, so spread them over threads
+        fresh_results = get_tesseract_pool().map(extract_text_with_tesseract, pending_images, [image_type] * len(pending))
+    else:
+        fresh_results = extract_text_with_easyocr_batch(pending_images, image_type)
+    for index, result in zip(pending, fresh_results):
+        results[index] = result
+        store_cached_result(lookups[index][0], result)
+    return results
+
+
+def confidence_percent(engine, conf):
+    # Tesseract reports confidence as 0-100, EasyOCR as 0-1
+    return conf * 100 if engine == 'easyocr' else conf
+
+
+def text_matches_catalog(text, image_type='title'):
+    if image_type == 'title':
+        return find_best_item_match(text)[0] is not None
+    return find_best_trait_match(process_trait_text(text)) is not None
+
+
+def check_cascade_result(engine, result, image_type='title'):
+    # Returns (accepted, matched): the first engine's result is accepted when it is
+    # confident enough and matches the catalog
+    text, conf = result
+    matched = bool(text) and text_matches_catalog(text, image_type)
+    return matched and confidence_percent(engine, conf) >= CASCADE_CONFIDENCE, matched
+
+
+def select_cascade_text(image_type, first_result, first_matched, fallback_result):
+    first_engine, second_engine = CASCADE_ORDER
+    text, conf = first_result
+    fallback_text, fallback_conf = fallback_result
+    fallback_matched = bool(fallback_text) and text_matches_catalog(fallback_text, image_type)
+
+    # Prefer a result that matches the catalog, then the higher confidence
+    if (fallback_matched, confidence_percent(second_engine, fallback_conf)) > (first_matched, confidence_percent(first_engine, conf)):
+        final_text = fallback_text
+    else:
+        final_text = text
+    logging.debug(f"Cascade OCR text ({image_type}): '{final_text}' after fallback, "
+                  f"{first_engine} conf: {conf}, {second_engine} conf: {fallback_conf}")
+    return final_text
+
+
+def extract_text_with_cascade(image, image_type='title'):
+    # Run the cheap engine first and only fall back to the second one for doubtful results
+    first_engine, second_engine = CASCADE_ORDER
+    increment_counter(f'cascade_{image_type}')
+    first_result = run_ocr_engine(first_engine, image, image_type)
+    accepted, first_matched = check_cascade_result(first_engine, first_result, image_type)
+    if accepted:
+        logging.debug(f"Cascade OCR text ({image_type}): '{first_result[0]}' accepted from {first_engine} with confidence {first_result[1]}")
+        return first_result[0]
+
+    increment_counter(f'cascade_{image_type}_fallback')
+    fallback_result = run_ocr_engine(second_engine, image, image_type)
+    return select_cascade_text(image_type, first_result, first_matched, fallback_result)
+
+
+def select_best_text(image_type, tesseract_result, easyocr_result):
+    # Choose the result with higher confidence
+    tesseract_text, tesseract_conf = tesseract_result
+    easyocr_text, easyocr_conf = easyocr_result
     if tesseract_conf >= easyocr_conf:
         final_text = tesseract_text
     else:
@@ -212,6 +667,130 @@ def extract_text_from_image(image, image_type='title'):
 
     logging.debug(f"Final OCR text ({image_type}): '{final_text}' with Tesseract conf: {tesseract_conf}, EasyOCR conf: {easyocr_conf}")
     return final_text
+
+
+def extract_text_from_image(image, image_type='title'):
+    if OCR_MODE == 'cascade' and ENGINES == 'both':
+        return extract_text_with_cascade(image, image_type)
+
+    # Use the enabled OCR engines and choose the result with higher confidence
+    tesseract_result = easyocr_result = ("", 0)
+    if engine_enabled('tesseract'):
+        tesseract_result = run_ocr_engine('tesseract', image, image_type)
+    if engine_enabled('easyocr'):
+        easyocr_result = run_ocr_engine('easyocr', image, image_type)
+    return select_best_text(image_type, tesseract_result, easyocr_result)
+
+
+def extract_texts_batched(images, image_type='title'):
+    # Batched counterpart of extract_text_from_image: returns one text per crop
+    if OCR_MODE == 'cascade' and ENGINES == 'both':
+        first_engine, second_engine = CASCADE_ORDER
+        increment_counter(f'cascade_{image_type}', len(images))
+        first_results = run_ocr_engine_batch(first_engine, images, image_type)
+        checks = [check_cascade_result(first_engine, result, image_type) for result in first_results]
+        texts = [result[0] for result in first_results]
+
+        # Only the doubtful crops go through the second engine, still as one batch
+        pending = [index for index, (accepted, _) in enumerate(checks) if not accepted]
+        increment_counter(f'cascade_{image_type}_fallback', len(pending))
+        fallback_results = run_ocr_engine_batch(second_engine, [images[index] for index in pending], image_type)
+        for index, fallback_result in zip(pending, fallback_results):
+            texts[index] = select_cascade_text(image_type, first_results[index], checks[index][1], fallback_result)
+        return texts
+
+    no_results = [("", 0)] * len(images)
+    tesseract_results = run_ocr_engine_batch('tesseract', images, image_type) if engine_enabled('tesseract') else no_results
+    easyocr_results = run_ocr_engine_batch('easyocr', images, image_type) if engine_enabled('easyocr') else no_results
+    return [select_best_text(image_type, tesseract_result, easyocr_result)
+            for tesseract_result, easyocr_result in zip(tesseract_results, easyocr_results)]
+# ----------------------------------------------------------
+
+
+# ------------------- Crop Recognition -------------------
+# Lookups tried before OCR: the fingerprint index of previously confirmed crops (titles and
+# traits) and the rendered title templates. Confident OCR results teach both.
+def recognize_crop(image, image_type='title'):
+    # Returns (catalog name or None, preprocessed crop, perceptual hash or None)
+    processed_img = preprocess_image(image)
+    if processed_img is None:
+        return None, None, None
+    fingerprint = None
+    if FINGERPRINT_INDEX_PATH:
+        fingerprint = fingerprint_index.perceptual_hash(processed_img)
+        name = get_fingerprints().lookup(image_type, fingerprint) if fingerprint is not None else None
+        if name:
+            increment_counter('fingerprint_hit')
+            logging.debug(f"Fingerprint index matched {image_type} '{name}'")
+            return name, processed_img, fingerprint
+        increment_counter('fingerprint_miss')
+    if image_type == 'title' and TITLE_TEMPLATES:
+        name, score = get_title_templates().recognize(processed_img)
+        if name:
+            increment_counter('title_template_hit')
+            logging.debug(f"Title template matched '{name}' with score {score:.3f}")
+            return name, processed_img, fingerprint
+        increment_counter('title_template_miss')
+    return None, processed_img, fingerprint
+
+
+def confirmed_name(text, image_type='title'):
+    # Catalog name an OCR text resolves to exactly or with at least FINGERPRINT_MIN_SCORE, or None
+    ensure_catalogs()
+    if image_type == 'title':
+        matched_normalized_name, score = match_item_text(text.lower())
+        name = normalized_items.get(matched_normalized_name)
+    else:
+        matched_normalized_trait, score = match_trait_text(process_trait_text(text))
+        name = trait_names_by_normalized.get(matched_normalized_trait)
+        # A recognized trait is returned as its name, which must resolve to itself again
+        if name is not None and trait_names_by_normalized.get(process_trait_text(name)) != name:
+            return None
+    if name is None or (score is not None and score < FINGERPRINT_MIN_SCORE):
+        return None
+    return name
+
+
+def learn_crop(text, image_type, processed_img, fingerprint):
+    if processed_img is None or not text:
+        return
+    if image_type == 'title' and TITLE_TEMPLATES:
+        # Only OCR text that exactly names a catalog item becomes a template
+        matched_name = normalized_items.get(text.lower())
+        if matched_name:
+            get_title_templates().learn(matched_name, processed_img)
+    if fingerprint is not None:
+        name = confirmed_name(text, image_type)
+        if name:
+            get_fingerprints().add(image_type, fingerprint, name)
+
+
+def recognition_enabled(image_type):
+    return bool(FINGERPRINT_INDEX_PATH) or (image_type == 'title' and TITLE_TEMPLATES)
+
+
+def extract_crop_text(image, image_type='title'):
+    if not recognition_enabled(image_type):
+        return extract_text_from_image(image, image_type)
+    name, processed_img, fingerprint = recognize_crop(image, image_type)
+    if name:
+        return name
+    text = extract_text_from_image(image, image_type)
+    learn_crop(text, image_type, processed_img, fingerprint)
+    return text
+
+
+def extract_crop_texts_batched(images, image_type='title'):
+    # Batched counterpart of extract_crop_text: only unrecognized crops are OCR'd
+    if not recognition_enabled(image_type):
+        return extract_texts_batched(images, image_type)
+    recognized = [recognize_crop(image, image_type) for image in images]
+    texts = [name for name, _, _ in recognized]
+    pending = [index for index, text in enumerate(texts) if text is None]
+    for index, text in zip(pending, extract_texts_batched([images[i] for i in pending], image_type)):
+        texts[index] = text
+        learn_crop(text, image_type, recognized[index][1], recognized[index][2])
+    return texts
 # ----------------------------------------------------------
 
 
@@ -230,128 +809,409 @@ def process_trait_text(trait_text):
 
 
 # ------------------- Matching Functions -------------------
-def find_best_item_match(ocr_text):
-    normalized_text = ocr_text.lower()
-    # Exact match
-    if normalized_text in normalized_items:
-        matched_name = normalized_items[normalized_text]
-        item_info = known_items[matched_name]
-        logging.debug(f"Exact matched '{ocr_text}' to '{matched_name}'")
-        return matched_name, item_info
-
-    # Fuzzy matching
+def fuzzy_match(normalized_text, candidate_index):
+    # Score only the catalog names that can reach the cutoff; the candidates keep catalog
+    # order, so ties resolve exactly as when scoring the whole catalog
+    choices = match_index.candidate_names(candidate_index, normalized_text, MATCH_SCORE_CUTOFF)
+    if not choices:
+        return None, None
     matches = process.extract(
-        normalized_text, normalized_item_names,
+        normalized_text, choices,
         scorer=fuzz.token_sort_ratio, limit=5
     )
-    # Filter matches with score >= 80
-    high_score_matches = [match for match in matches if match[1] >= 80]
-    if high_score_matches:
-        # Sort by score (descending) and length (descending)
-        high_score_matches.sort(key=lambda x: (x[1], len(x[0])), reverse=True)
-        best_match = high_score_matches[0]
-        matched_normalized_name = best_match[0]
-        matched_name = normalized_items[matched_normalized_name]
-        item_info = known_items[matched_name]
-        logging.debug(f"Fuzzy matched '{ocr_text}' to '{matched_name}' with score {best_match[1]}")
-        return matched_name, item_info
-    else:
-        logging.warning(f"Unmatched item: '{ocr_text}'")
+    # Filter matches with score >= cutoff
+    high_score_matches = [match for match in matches if match[1] >= MATCH_SCORE_CUTOFF]
+    if not high_score_matches:
         return None, None
+    # Sort by score (descending) and length (descending)
+    high_score_matches.sort(key=lambda x: (x[1], len(x[0])), reverse=True)
+    best_match = high_score_matches[0]
+    return best_match[0], best_match[1]
 
 
-def find_best_trait_match(normalized_text):
-    # Exact match
+@lru_cache(maxsize=MATCH_CACHE_SIZE)
+def match_item_text(normalized_text):
+    # Returns (normalized catalog name, score); score is None for exact matches
+    if normalized_text in normalized_items:
+        return normalized_text, None
+    return fuzzy_match(normalized_text, item_match_index)
+
+
+@lru_cache(maxsize=MATCH_CACHE_SIZE)
+def match_trait_text(normalized_text):
+    # Returns (normalized trait, score); score is None for exact matches
     if normalized_text in normalized_traits_set:
-        index = normalized_traits.index(normalized_text)
-        trait_name = traits[index]
-        logging.debug(f"Exact matched trait '{normalized_text}' to '{trait_name}'")
-        return trait_name
+        return normalized_text, None
+    return fuzzy_match(normalized_text, trait_match_index)
 
-    # Fuzzy matching
-    matches = process.extract(
-        normalized_text, normalized_traits,
-        scorer=fuzz.token_sort_ratio, limit=5
-    )
-    # Filter matches with score >= 80
-    high_score_matches = [match for match in matches if match[1] >= 80]
-    if high_score_matches:
-        # Sort by score (descending) and length (descending)
-        high_score_matches.sort(key=lambda x: (x[1], len(x[0])), reverse=True)
-        best_match = high_score_matches[0]
-        matched_normalized_trait = best_match[0]
-        index = normalized_traits.index(matched_normalized_trait)
-        trait_name = traits[index]
-        logging.debug(f"Fuzzy matched trait '{normalized_text}' to '{trait_name}' with score {best_match[1]}")
-        return trait_name
+
+def bulk_fuzzy_match(normalized_texts, choices):
+    # Score every query against every choice with one multi-core score matrix per block and
+    # apply the same rules as fuzzy_match: top 5 by score (ties in catalog order), cutoff,
+    # then the highest score and the longest name
+    results = []
+    choice_lengths = np.array([len(choice) for choice in choices])
+    for start in range(0, len(normalized_texts), MATCH_BLOCK_SIZE):
+        block = normalized_texts[start:start + MATCH_BLOCK_SIZE]
+        scores = process.cdist(block, choices, scorer=fuzz.token_sort_ratio, dtype=np.float64,
+                               score_cutoff=MATCH_SCORE_CUTOFF, workers=MATCH_WORKERS)
+        top = np.argsort(-scores, axis=1, kind='stable')[:, :5]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        best_scores = top_scores.max(axis=1)
+        top_lengths = np.where(top_scores == best_scores[:, None], choice_lengths[top], -1)
+        best = top[np.arange(len(block)), top_lengths.argmax(axis=1)]
+        for best_score, best_index in zip(best_scores, best):
+            if best_score >= MATCH_SCORE_CUTOFF:
+                results.append((choices[best_index], float(best_score)))
+            else:
+                results.append((None, None))
+    return results
+
+
+def bulk_match_texts(normalized_texts, exact_names, choices):
+    # Exact matches come from the dict; each distinct remaining text is scored once
+    matches = {text: (text, None) for text in set(normalized_texts) if text in exact_names}
+    pending = sorted({text for text in normalized_texts if text not in matches})
+    if pending and choices:
+        matches.update(zip(pending, bulk_fuzzy_match(pending, choices)))
+    return [matches.get(text, (None, None)) for text in normalized_texts]
+
+
+@metrics.timed('match_item_batch')
+def find_best_item_matches(ocr_texts):
+    # Bulk counterpart of find_best_item_match: one (item_name, item_info) per OCR title
+    ensure_catalogs()
+    results = []
+    for ocr_text, (matched_normalized_name, score) in zip(
+            ocr_texts, bulk_match_texts([text.lower() for text in ocr_texts], normalized_items, normalized_item_names)):
+        if matched_normalized_name is None:
+            logging.warning(f"Unmatched item: '{ocr_text}'")
+            results.append((None, None))
+            continue
+        matched_name = normalized_items[matched_normalized_name]
+        if score is None:
+            logging.debug(f"Exact matched '{ocr_text}' to '{matched_name}'")
+        else:
+            logging.debug(f"Fuzzy matched '{ocr_text}' to '{matched_name}' with score {score}")
+        results.append((matched_name, known_items[matched_name]))
+    return results
+
+
+@metrics.timed('match_trait_batch')
+def find_best_trait_matches(normalized_texts):
+    # Bulk counterpart of find_best_trait_match: one trait name (or None) per processed trait text
+    ensure_catalogs()
+    results = []
+    for normalized_text, (matched_normalized_trait, score) in zip(
+            normalized_texts, bulk_match_texts(normalized_texts, trait_names_by_normalized, normalized_traits)):
+        if matched_normalized_trait is None:
+            logging.warning(f"Unmatched trait: '{normalized_text}'")
+            results.append(None)
+            continue
+        trait_name = trait_names_by_normalized[matched_normalized_trait]
+        if score is None:
+            logging.debug(f"Exact matched trait '{normalized_text}' to '{trait_name}'")
+        else:
+            logging.debug(f"Fuzzy matched trait '{normalized_text}' to '{trait_name}' with score {score}")
+        results.append(trait_name)
+    return results
+
+
+@metrics.timed('match_item')
+def find_best_item_match(ocr_text):
+    ensure_catalogs()
+    matched_normalized_name, score = match_item_text(ocr_text.lower())
+    if matched_normalized_name is None:
+        logging.warning(f"Unmatched item: '{ocr_text}'")
+        return None, None
+
+    matched_name = normalized_items[matched_normalized_name]
+    item_info = known_items[matched_name]
+    if score is None:
+        logging.debug(f"Exact matched '{ocr_text}' to '{matched_name}'")
     else:
+        logging.debug(f"Fuzzy matched '{ocr_text}' to '{matched_name}' with score {score}")
+    return matched_name, item_info
+
+
+@metrics.timed('match_trait')
+def find_best_trait_match(normalized_text):
+    ensure_catalogs()
+    matched_normalized_trait, score = match_trait_text(normalized_text)
+    if matched_normalized_trait is None:
         logging.warning(f"Unmatched trait: '{normalized_text}'")
         return None
+
+    trait_name = trait_names_by_normalized[matched_normalized_trait]
+    if score is None:
+        logging.debug(f"Exact matched trait '{normalized_text}' to '{trait_name}'")
+    else:
+        logging.debug(f"Fuzzy matched trait '{normalized_text}' to '{trait_name}' with score {score}")
+    return trait_name
 # ----------------------------------------------------------
 
 
+# ------------------- Parallel Execution -------------------
+def get_worker_settings():
+    return {name: globals()[name] for name in WORKER_SETTINGS}
+
+
+def init_ocr_worker(settings):
+    # Runs once in every worker process: build a private OCR engine and catalog
+    # instead of sharing (or inheriting a forked copy of) the parent's
+    global easy_reader, MAX_WORKERS
+    globals().update(settings)
+    # The pool supplies the parallelism, so batched Tesseract calls run on a single thread here
+    MAX_WORKERS = 1
+    metrics.enable(bool(METRICS_FOLDER))
+    cv2.setNumThreads(1)
+    if engine_enabled('easyocr'):
+        import torch
+        torch.set_num_threads(1)
+        easy_reader = None
+        get_easy_reader()
+    load_catalogs()
+    logging.info(f"OCR worker {os.getpid()} ready.")
+
+
+def run_parallel(func, *iterables, executor=EXECUTOR, max_workers=MAX_WORKERS, chunk_size=CHUNK_SIZE):
+    # Map func over the iterables on a thread or process pool and return the non-empty results in order
+    # The pool backlog gauge counts the tasks whose results haven't been collected yet
+    backlog = min(len(iterable) for iterable in iterables)
+    metrics.set_gauge('pool_backlog', backlog)
+    results = []
+    if executor == 'process':
+        # Compile the catalog here first, so the workers all load the same artifact instead of each building it
+        ensure_catalogs()
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_ocr_worker,
+                                 initargs=(get_worker_settings(),)) as pool:
+            for result, counters, worker_metrics in pool.map(partial(run_in_worker, func), *iterables,
+                                                             chunksize=chunk_size):
+                with _counters_lock:
+                    ocr_counters.update(counters)
+                metrics.merge(worker_metrics)
+                backlog -= 1
+                metrics.set_gauge('pool_backlog', backlog)
+                if result:
+                    results.append(result)
+            return results
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for result in pool.map(func, *iterables):
+            backlog -= 1
+            metrics.set_gauge('pool_backlog', backlog)
+            if result:
+                results.append(result)
+        return results
+
+
+def run_in_worker(func, *args):
+    # Hand the counters and metrics produced in a worker process back to the parent with the result
+    return func(*args), drain_counters(), metrics.drain()
+# ------------------------------------------------------------
+
+
 # ------------------- Process Single Image Group -------------------
-def process_single_image_group(unique_id, paths):
-    title_path = paths.get('title')
-    trait_path = paths.get('trait')
+def process_image_pair(unique_id, title_img, trait_img):
+    # OCR and match an in-memory title/trait crop pair (BGR arrays, either may be None)
+    title_text = extract_crop_text(title_img, 'title') if title_img is not None else None
+    trait_text = extract_crop_text(trait_img, 'trait') if trait_img is not None else None
+    return match_image_pair_texts(unique_id, title_text, trait_text)
+
+
+def match_image_pair_texts(unique_id, title_text, trait_text):
+    # Match the OCR text of a title/trait pair (None for a missing image) and build its output row
+    item_match = find_best_item_match(title_text) if title_text is not None else None
+    trait_name = find_best_trait_match(process_trait_text(trait_text)) if trait_text is not None else None
+    return build_output_row(unique_id, title_text, item_match, trait_text, trait_name)
+
+
+def build_output_row(unique_id, title_text, item_match, trait_text, trait_name):
     matched_items, matched_traits = [], []
     rarity = "Unknown"
     item_type = "Unknown"
 
+    # Process title text
+    if title_text is not None:
+        logging.debug(f"Unique ID {unique_id}: OCR title text: '{title_text}'")
+
+        # Best item match
+        item_name, item_info = item_match
+        if item_name:
+            matched_items.append(item_name)
+            rarity = item_info['Rarity']
+            item_type = item_info['Type']
+            logging.debug(f"Unique ID {unique_id}: Matched item '{item_name}' with rarity '{rarity}' and type '{item_type}'")
+        else:
+            matched_items.append("No Match Found")
+            logging.debug(f"Unique ID {unique_id}: No item match found.")
+
+    # Process trait text
+    if trait_text is not None:
+        logging.debug(f"Unique ID {unique_id}: OCR trait text: '{trait_text}'")
+
+        # Best trait match
+        if trait_name:
+            matched_traits.append(trait_name)
+            logging.debug(f"Unique ID {unique_id}: Matched trait '{trait_name}'")
+        else:
+            matched_traits.append("No Traits Found")
+            logging.debug(f"Unique ID {unique_id}: No trait match found.")
+
+    # Save the processed data for the current pair
+    item_info = {
+        "File": unique_id,
+        "Matched Items": ', '.join(matched_items),
+        "Type": item_type,
+        "Rarity": rarity,
+        "Matched Traits": ', '.join(matched_traits)
+    }
+    return item_info
+
+
+def load_image_group(unique_id, paths):
+    # Decode a cropped title/trait pair; returns (unique_id, title_img, trait_img) or None
+    title_path = paths.get('title')
+    trait_path = paths.get('trait')
+
     if title_path and trait_path:
-        # Process title image
-        title_img = cv2.imread(title_path)
-        if title_img is not None:
-            title_text = extract_text_from_image(title_img, 'title')
-            logging.debug(f"Unique ID {unique_id}: OCR title text: '{title_text}'")
-
-            # Find best item match
-            item_name, item_info = find_best_item_match(title_text)
-            if item_name:
-                matched_items.append(item_name)
-                rarity = item_info['Rarity']
-                item_type = item_info['Type']
-                logging.debug(f"Unique ID {unique_id}: Matched item '{item_name}' with rarity '{rarity}' and type '{item_type}'")
-            else:
-                matched_items.append("No Match Found")
-                logging.debug(f"Unique ID {unique_id}: No item match found.")
-
-        # Process trait image
-        trait_img = cv2.imread(trait_path)
-        if trait_img is not None:
-            trait_text = extract_text_from_image(trait_img, 'trait')
-            logging.debug(f"Unique ID {unique_id}: OCR trait text: '{trait_text}'")
-
-            # Clean and normalize the trait text
-            normalized_trait_text = process_trait_text(trait_text)
-
-            # Find best trait match
-            trait_name = find_best_trait_match(normalized_trait_text)
-            if trait_name:
-                matched_traits.append(trait_name)
-                logging.debug(f"Unique ID {unique_id}: Matched trait '{trait_name}'")
-            else:
-                matched_traits.append("No Traits Found")
-                logging.debug(f"Unique ID {unique_id}: No trait match found.")
-
-        # Save the processed data for the current pair
-        item_info = {
-            "File": unique_id,
-            "Matched Items": ', '.join(matched_items),
-            "Type": item_type,
-            "Rarity": rarity,
-            "Matched Traits": ', '.join(matched_traits)
-        }
-        return item_info
+        with metrics.timer('decode'):
+            title_img = cv2.imread(title_path)
+            trait_img = cv2.imread(trait_path)
+        return unique_id, title_img, trait_img
     else:
         logging.warning(f"Unique ID {unique_id}: Missing title or trait image.")
         return None
 
+
+@metrics.timed('image_group')
+def process_single_image_group(unique_id, paths):
+    image_pair = load_image_group(unique_id, paths)
+    if image_pair is None:
+        return None
+    return process_image_pair(*image_pair)
+
+
+def process_image_pairs_batched(image_pairs):
+    # OCR a list of (unique_id, title_img, trait_img) with one batched OCR pass per crop type
+    title_indices = [index for index, (_, title_img, _) in enumerate(image_pairs) if title_img is not None]
+    trait_indices = [index for index, (_, _, trait_img) in enumerate(image_pairs) if trait_img is not None]
+    title_texts = [None] * len(image_pairs)
+    trait_texts = [None] * len(image_pairs)
+    for index, text in zip(title_indices, extract_crop_texts_batched([image_pairs[i][1] for i in title_indices], 'title')):
+        title_texts[index] = text
+    for index, text in zip(trait_indices, extract_crop_texts_batched([image_pairs[i][2] for i in trait_indices], 'trait')):
+        trait_texts[index] = text
+
+    # Match the whole batch in one vectorized stage
+    item_matches = [None] * len(image_pairs)
+    trait_names = [None] * len(image_pairs)
+    for index, item_match in zip(title_indices, find_best_item_matches([title_texts[i] for i in title_indices])):
+        item_matches[index] = item_match
+    normalized_trait_texts = [process_trait_text(trait_texts[i]) for i in trait_indices]
+    for index, trait_name in zip(trait_indices, find_best_trait_matches(normalized_trait_texts)):
+        trait_names[index] = trait_name
+
+    return [build_output_row(unique_id, title_text, item_match, trait_text, trait_name)
+            for (unique_id, _, _), title_text, item_match, trait_text, trait_name
+            in zip(image_pairs, title_texts, item_matches, trait_texts, trait_names)]
+
+
+def process_batch(load_func, tasks):
+    # Decode and OCR one batch of tasks; runs in a worker process when batches go to a process pool
+    return process_image_pairs_batched([pair for pair in itertools.starmap(load_func, tasks) if pair])
+
+
+def run_batched(load_func, *iterables, batch_size=EASYOCR_BATCH_SIZE, executor=EXECUTOR, max_workers=MAX_WORKERS):
+    # Decode batch_size image pairs at a time (on threads) and OCR each batch in one pass. With the
+    # process executor, whole batches go to the worker processes, each OCR'ing with its own engine.
+    tasks = list(zip(*iterables))
+    batches = [tasks[start:start + batch_size] for start in range(0, len(tasks), batch_size)]
+    if executor == 'process':
+        batch_rows = run_parallel(process_batch, [load_func] * len(batches), batches,
+                                  executor=executor, max_workers=max_workers, chunk_size=1)
+        return [row for rows in batch_rows for row in rows]
+    data = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for batch in batches:
+            image_pairs = [pair for pair in pool.map(load_func, *zip(*batch)) if pair]
+            data.extend(process_image_pairs_batched(image_pairs))
+            done += len(batch)
+            logging.info(f"Processed batch of {len(image_pairs)} image groups ({done}/{len(tasks)}).")
+    return data
+
+# --------------------------------------------------------------
+
+
+# ------------------- Incremental Manifest -------------------
+def load_manifest():
+    # Maps each processed unique ID to the (mtime, size) signature of its input files
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        logging.error(f"Failed to load manifest {MANIFEST_PATH}, reprocessing everything: {e}")
+        return {}
+
+
+def save_manifest(manifest):
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    temp_path = MANIFEST_PATH + '.tmp'
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(temp_path, MANIFEST_PATH)
+    logging.info(f"Manifest saved to {MANIFEST_PATH} ({len(manifest)} entries)")
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_output_files():
+    # File values of the rows already in the output CSV
+    if not os.path.exists(OUTPUT_CSV):
+        return set()
+    try:
+        with open(OUTPUT_CSV, "r", newline="", encoding="utf-8") as file:
+            return {row['File'] for row in csv.DictReader(file) if row.get('File')}
+    except (OSError, csv.Error) as e:
+        logging.error(f"Failed to read {OUTPUT_CSV}, treating it as empty: {e}")
+        return set()
+
+
+def prune_manifest(manifest, output_files):
+    # Drop the entries whose rows are no longer in the output (deleted, or overwritten by a
+    # non-incremental run), so their inputs are processed again
+    missing = [unique_id for unique_id in manifest if unique_id not in output_files]
+    for unique_id in missing:
+        del manifest[unique_id]
+    if missing:
+        logging.info(f"{len(missing)} manifest entries have no rows in {OUTPUT_CSV} and will be processed again.")
+
+
+def filter_unchanged(signatures, manifest):
+    # Returns the unique IDs whose input files are new or changed since the manifest was written
+    # and whose rows are still in the output
+    prune_manifest(manifest, load_output_files())
+    pending = [unique_id for unique_id, signature in signatures.items() if manifest.get(unique_id) != signature]
+    logging.info(f"Incremental run: {len(pending)} of {len(signatures)} inputs are new or changed.")
+    return pending
+
+
+def record_processed(data, signatures, manifest):
+    for row in data:
+        manifest[row['File']] = signatures[row['File']]
 # --------------------------------------------------------------
 
 
 # ------------------- Process Cropped Images -------------------
-def process_cropped_images():
+def process_cropped_images(executor=EXECUTOR, max_workers=MAX_WORKERS, chunk_size=CHUNK_SIZE,
+                           batch_size=EASYOCR_BATCH_SIZE, manifest=None):
+    # With a manifest, only new or changed groups are processed and the manifest is updated in place
     data = []
     if not os.path.exists(CROPPED_FOLDER):
         logging.error(f"Cropped folder does not exist: {CROPPED_FOLDER}")
@@ -360,28 +1220,92 @@ def process_cropped_images():
     files = sorted(os.listdir(CROPPED_FOLDER))
     image_groups = {}
 
-    # Group images by unique identifier
+    # Group images by unique identifier: the whole name after the crop type prefix (the full
+    # capture timestamp or screenshot name), so crops from different sessions never share a key
     for file in files:
-        unique_id = re.search(r'_(\d+)\.png$', file)
-        if unique_id:
-            unique_id = unique_id.group(1)
-            if unique_id not in image_groups:
-                image_groups[unique_id] = {}
-            if file.startswith("title_cropped"):
-                image_groups[unique_id]['title'] = os.path.join(CROPPED_FOLDER, file)
-            elif file.startswith("trait_cropped"):
-                image_groups[unique_id]['trait'] = os.path.join(CROPPED_FOLDER, file)
+        match = re.match(r'(title|trait)_cropped_(.+)\.png$', file)
+        if match:
+            image_type, unique_id = match.groups()
+            image_groups.setdefault(unique_id, {})[image_type] = os.path.join(CROPPED_FOLDER, file)
 
     logging.info(f"Found {len(image_groups)} unique image groups.")
 
-    # Process images in parallel
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [executor.submit(process_single_image_group, uid, paths)
-                   for uid, paths in image_groups.items()]
-        for future in futures:
-            result = future.result()
-            if result:
-                data.append(result)
+    if manifest is not None:
+        signatures = {unique_id: {image_type: file_signature(path) for image_type, path in sorted(paths.items())}
+                      for unique_id, paths in image_groups.items()}
+        image_groups = {unique_id: image_groups[unique_id] for unique_id in filter_unchanged(signatures, manifest)}
+
+    # Process images in batches, or in parallel one group at a time
+    if batch_size:
+        data = run_batched(load_image_group, image_groups.keys(), image_groups.values(),
+                           batch_size=batch_size, executor=executor, max_workers=max_workers)
+    else:
+        data = run_parallel(process_single_image_group, image_groups.keys(), image_groups.values(),
+                            executor=executor, max_workers=max_workers, chunk_size=chunk_size)
+
+    if manifest is not None:
+        record_processed(data, signatures, manifest)
+
+    logging.info(f"Total items processed: {len(data)}")
+    return data
+# --------------------------------------------------------------
+
+
+# ------------------- Process Screenshots -------------------
+def load_screenshot(screenshot_path, title_template, trait_template, debug_crops_folder=None):
+    # Crop a screenshot in memory; returns (unique_id, title_img, trait_img) or None
+    unique_id = os.path.splitext(os.path.basename(screenshot_path))[0]
+    crops = crop_screenshot.crop_sections(screenshot_path, title_template, trait_template, debug_crops_folder)
+    if crops is None:
+        logging.warning(f"Unique ID {unique_id}: Could not crop screenshot '{screenshot_path}'.")
+        return None
+    title_img, trait_img = crops
+    return unique_id, title_img, trait_img
+
+
+def process_single_screenshot(screenshot_path, title_template, trait_template, debug_crops_folder=None):
+    # Crop a screenshot in memory and feed the crops straight into OCR
+    image_pair = load_screenshot(screenshot_path, title_template, trait_template, debug_crops_folder)
+    if image_pair is None:
+        return None
+    return process_image_pair(*image_pair)
+
+
+def process_screenshots(screenshot_folder=SCREENSHOT_FOLDER, debug_crops_folder=None,
+                        executor=EXECUTOR, max_workers=MAX_WORKERS, chunk_size=CHUNK_SIZE,
+                        batch_size=EASYOCR_BATCH_SIZE, manifest=None):
+    data = []
+    if not os.path.exists(screenshot_folder):
+        logging.error(f"Screenshot folder does not exist: {screenshot_folder}")
+        return data
+
+    title_template, trait_template = crop_screenshot.load_templates(TEMPLATES_FOLDER)
+    if title_template is None or trait_template is None:
+        return data
+
+    if debug_crops_folder:
+        os.makedirs(debug_crops_folder, exist_ok=True)
+
+    screenshot_paths = crop_screenshot.list_screenshots(screenshot_folder)
+    logging.info(f"Found {len(screenshot_paths)} screenshots.")
+
+    if manifest is not None:
+        paths_by_id = {os.path.splitext(os.path.basename(path))[0]: path for path in screenshot_paths}
+        signatures = {unique_id: {'screenshot': file_signature(path)} for unique_id, path in paths_by_id.items()}
+        screenshot_paths = [paths_by_id[unique_id] for unique_id in filter_unchanged(signatures, manifest)]
+
+    # Crop and OCR screenshots in parallel without the PNG round-trip
+    count = len(screenshot_paths)
+    screenshot_args = (screenshot_paths, [title_template] * count, [trait_template] * count, [debug_crops_folder] * count)
+    if batch_size:
+        data = run_batched(load_screenshot, *screenshot_args, batch_size=batch_size, executor=executor,
+                           max_workers=max_workers)
+    else:
+        data = run_parallel(process_single_screenshot, *screenshot_args,
+                            executor=executor, max_workers=max_workers, chunk_size=chunk_size)
+
+    if manifest is not None:
+        record_processed(data, signatures, manifest)
 
     logging.info(f"Total items processed: {len(data)}")
     return data
@@ -389,25 +1313,283 @@ def process_cropped_images():
 
 
 # ------------------- Save Data to CSV -------------------
-def save_data(data):
+def save_data(data, merge=False):
+    # With merge, rows replace the existing rows with the same File and everything else is kept
     if not data:
         logging.warning("No data to save.")
-        return
+        return False
+    import pandas as pd
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
     df = pd.DataFrame(data)
+    if merge and os.path.exists(OUTPUT_CSV):
+        existing = pd.read_csv(OUTPUT_CSV, dtype=str, keep_default_na=False)
+        existing = existing[~existing['File'].isin(df['File'])]
+        logging.info(f"Merging {len(df)} new rows into {len(existing)} existing rows.")
+        df = pd.concat([existing, df], ignore_index=True)
     try:
-        df.to_csv(OUTPUT_CSV, index=False)
+        with metrics.timer('write_csv'):
+            df.to_csv(OUTPUT_CSV, index=False)
         logging.info(f"Data successfully saved to {OUTPUT_CSV}")
     except Exception as e:
         logging.error(f"Failed to save data to CSV: {e}")
+        return False
+    if WRITE_PARQUET:
+        save_parquet(df)
+    store_rows(data)
+    return True
+
+
+def store_rows(rows):
+    # Keep the full history in the inventory store; the CSV only holds the latest run
+    if not INVENTORY_DB_PATH:
+        return
+    try:
+        with metrics.timer('write_inventory_db'):
+            inventory_store.upsert_rows(INVENTORY_DB_PATH, rows)
+    except Exception as e:
+        logging.error(f"Failed to store rows in the inventory store: {e}")
+
+
+def save_parquet(df):
+    # Typed copy of the CSV for fast loading; empty cells become nulls, as they do when the CSV is read back
+    if importlib.util.find_spec('pyarrow') is None:
+        logging.warning("pyarrow is not installed, skipping the Parquet output.")
+        return
+    df = df.replace('', None)
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype('category')
+    temp_path = OUTPUT_PARQUET + '.tmp'
+    try:
+        with metrics.timer('write_parquet'):
+            df.to_parquet(temp_path, engine='pyarrow', index=False)
+        os.replace(temp_path, OUTPUT_PARQUET)
+        logging.info(f"Data successfully saved to {OUTPUT_PARQUET}")
+    except Exception as e:
+        logging.error(f"Failed to save data to Parquet: {e}")
+
+# ---------------------------------------------------------
+
+
+# ------------------- Watch Mode -------------------
+def start_folder_observer(folder, events):
+    # Push the paths of changed files onto events as they happen; returns None when watchdog
+    # isn't installed and the folder has to be polled instead
+    if importlib.util.find_spec('watchdog') is None:
+        return None
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+
+    class ScreenshotEventHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if not event.is_directory:
+                events.put(getattr(event, 'dest_path', '') or event.src_path)
+
+    observer = Observer()
+    observer.schedule(ScreenshotEventHandler(), folder, recursive=False)
+    observer.start()
+    return observer
+
 
+def find_ready_screenshots(candidates, pending, seen):
+    # Returns the candidate screenshots that are new and whose signature has not changed for
+    # WATCH_SETTLE_SECONDS; files still being written stay in pending until they settle
+    now = time.monotonic()
+    ready = []
+    for path in candidates:
+        if not path.lower().endswith(crop_screenshot.SCREENSHOT_EXTENSIONS):
+            continue
+        try:
+            signature = file_signature(path)
+        except OSError:
+            pending.pop(path, None)
+            continue
+        if seen.get(path) == signature:
+            continue
+        first_seen = pending.get(path)
+        if first_seen is None or first_seen[0] != signature:
+            pending[path] = (signature, now)
+        elif now - first_seen[1] >= WATCH_SETTLE_SECONDS:
+            del pending[path]
+            seen[path] = signature
+            ready.append(path)
+    return ready
+
+
+def append_rows(rows):
+    # Append rows to the output CSV, writing the header when the file is new
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    write_header = not os.path.exists(OUTPUT_CSV) or os.path.getsize(OUTPUT_CSV) == 0
+    try:
+        with open(OUTPUT_CSV, "a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            if write_header:
+                writer.writeheader()
+            with metrics.timer('write_csv'):
+                writer.writerows(rows)
+        logging.info(f"Appended {len(rows)} rows to {OUTPUT_CSV}")
+    except OSError as e:
+        logging.error(f"Failed to append data to CSV: {e}")
+        return False
+    store_rows(rows)
+    return True
+
+
+def process_ready_screenshots(paths, templates, debug_crops_folder, manifest, output_files, pool):
+    signatures = {os.path.splitext(os.path.basename(path))[0]: {'screenshot': file_signature(path)} for path in paths}
+    process = partial(process_single_screenshot, title_template=templates[0], trait_template=templates[1],
+                      debug_crops_folder=debug_crops_folder)
+    rows = [row for row in pool.map(process, paths) if row]
+    if not rows:
+        return
+    # Screenshots that already have rows in the output (changed since they were processed)
+    # replace them; new ones are appended
+    if any(row['File'] in output_files for row in rows):
+        saved = save_data(rows, merge=True)
+    else:
+        saved = append_rows(rows)
+    if saved:
+        output_files.update(row['File'] for row in rows)
+        record_processed(rows, signatures, manifest)
+        save_manifest(manifest)
+
+
+def watch_screenshots(screenshot_folder=SCREENSHOT_FOLDER, debug_crops_folder=None, max_workers=MAX_WORKERS):
+    # Crop, OCR and record screenshots as they land, until interrupted. Engines and catalogs
+    # stay loaded between captures; screenshots already in the manifest or the output CSV are skipped.
+    templates = crop_screenshot.load_templates(TEMPLATES_FOLDER)
+    if templates[0] is None or templates[1] is None:
+        return
+    os.makedirs(screenshot_folder, exist_ok=True)
+    if debug_crops_folder:
+        os.makedirs(debug_crops_folder, exist_ok=True)
+
+    manifest = load_manifest()
+    output_files = load_output_files()
+    prune_manifest(manifest, output_files)
+    seen = {}
+    for path in crop_screenshot.list_screenshots(screenshot_folder):
+        unique_id = os.path.splitext(os.path.basename(path))[0]
+        if unique_id in manifest:
+            seen[path] = manifest[unique_id]['screenshot']
+        elif unique_id in output_files:
+            # Processed by a run that didn't write the manifest; its row is taken as current
+            seen[path] = file_signature(path)
+
+    # Load everything a capture needs before the first one arrives
+    ensure_catalogs()
+    if engine_enabled('easyocr'):
+        get_easy_reader()
+
+    events = queue.Queue()
+    observer = start_folder_observer(screenshot_folder, events)
+    logging.info(f"Watching {screenshot_folder} for new screenshots "
+                 f"({'filesystem events' if observer else f'polling every {WATCH_POLL_INTERVAL}s'}). Press Ctrl+C to stop.")
+    pending = {}
+    candidates = set(crop_screenshot.list_screenshots(screenshot_folder))
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while True:
+                if observer is None:
+                    candidates.update(crop_screenshot.list_screenshots(screenshot_folder))
+                else:
+                    while not events.empty():
+                        candidates.add(events.get_nowait())
+                candidates.update(pending)
+                ready = find_ready_screenshots(candidates, pending, seen)
+                metrics.set_gauge('watch_pending_screenshots', len(pending) + len(ready))
+                candidates = set()
+                if ready:
+                    logging.info(f"Processing {len(ready)} new screenshots.")
+                    process_ready_screenshots(ready, templates, debug_crops_folder, manifest, output_files, pool)
+                time.sleep(WATCH_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        logging.info("Watch mode stopped.")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
 # ---------------------------------------------------------
 
 
 # ------------------- Main Execution -------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract item and trait data from inventory screenshots.")
+    parser.add_argument('--screenshots', nargs='?', const=SCREENSHOT_FOLDER, default=None, metavar='FOLDER',
+                        help="Crop and OCR raw screenshots in a single pass instead of reading cropped_screenshots/")
+    parser.add_argument('--watch', nargs='?', const=SCREENSHOT_FOLDER, default=None, metavar='FOLDER',
+                        help="Keep running and crop, OCR and append every screenshot saved to the folder")
+    parser.add_argument('--save-crops', action='store_true',
+                        help=f"With --screenshots or --watch, also write the crops to {CROPPED_FOLDER} for debugging")
+    parser.add_argument('--executor', choices=['thread', 'process'], default=EXECUTOR,
+                        help="Run OCR on a thread pool or on a process pool with one OCR engine per worker")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help="Number of worker threads or processes")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="Number of image groups sent to a worker process at a time")
+    parser.add_argument('--engines', choices=ENGINE_CHOICES, default=ENGINES,
+                        help="OCR engines to run; only the selected engines are loaded")
+    parser.add_argument('--ocr-mode', choices=OCR_MODE_CHOICES, default=OCR_MODE,
+                        help="'best' runs both engines on every crop, 'cascade' only runs EasyOCR when Tesseract is unsure")
+    parser.add_argument('--cascade-confidence', type=float, default=CASCADE_CONFIDENCE,
+                        help="Tesseract confidence (0-100) below which the cascade falls back to EasyOCR")
+    parser.add_argument('--tesseract-backend', choices=TESSERACT_BACKEND_CHOICES, default=TESSERACT_BACKEND,
+                        help="Use persistent in-process tesserocr handles or the pytesseract subprocess per crop")
+    parser.add_argument('--ocr-cache', default=OCR_CACHE_PATH, metavar='PATH',
+                        help="SQLite file caching OCR results across runs")
+    parser.add_argument('--no-ocr-cache', action='store_true',
+                        help="Always run the OCR engines instead of reusing cached results")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only OCR new or changed inputs and merge their rows into the existing output")
+    parser.add_argument('--title-templates', action='store_true',
+                        help="Recognize titles against rendered catalog names first and only OCR the ones that don't match")
+    parser.add_argument('--fingerprints', nargs='?', const=DEFAULT_FINGERPRINT_INDEX_PATH, default=None, metavar='PATH',
+                        help="Recognize crops seen in earlier runs by perceptual hash and learn confirmed OCR results")
+    parser.add_argument('--parquet', action='store_true',
+                        help=f"Also write the output to {OUTPUT_PARQUET} for faster loading")
+    parser.add_argument('--inventory-db', nargs='?', const=inventory_store.DEFAULT_DB_PATH, default=None, metavar='PATH',
+                        help="Also upsert every row into a SQLite inventory store that keeps the full history")
+    parser.add_argument('--metrics', nargs='?', const=OUTPUT_FOLDER, default=None, metavar='FOLDER',
+                        help="Time every stage and write metrics.json and metrics.prom (Prometheus text format) to the folder")
+    parser.add_argument('--batch-size', type=int, default=EASYOCR_BATCH_SIZE,
+                        help="OCR this many image groups per batched EasyOCR call (0 disables batching)")
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = parse_args()
+    set_engines(args.engines)
+    OCR_MODE = args.ocr_mode
+    CASCADE_CONFIDENCE = args.cascade_confidence
+    TESSERACT_BACKEND = args.tesseract_backend
+    OCR_CACHE_PATH = None if args.no_ocr_cache else args.ocr_cache
+    TITLE_TEMPLATES = args.title_templates
+    FINGERPRINT_INDEX_PATH = args.fingerprints
+    WRITE_PARQUET = args.parquet
+    INVENTORY_DB_PATH = args.inventory_db
+    METRICS_FOLDER = args.metrics
+    metrics.enable(bool(METRICS_FOLDER))
     logging.info("Starting OCR Extraction Process")
-    data = process_cropped_images()
-    save_data(data)
-    logging.info("Data extraction complete. Processed data saved to 'output/processed_inventory.csv'.")
+    EASYOCR_BATCH_SIZE = args.batch_size
+    MAX_WORKERS = args.workers
+    if args.batch_size and args.chunk_size != CHUNK_SIZE:
+        logging.warning("--chunk-size is ignored with --batch-size: each worker is handed one batch at a time.")
+    pool_options = {'executor': args.executor, 'max_workers': args.workers, 'chunk_size': args.chunk_size,
+                    'batch_size': args.batch_size}
+    if args.watch:
+        watch_screenshots(args.watch, CROPPED_FOLDER if args.save_crops else None, max_workers=args.workers)
+        log_counters()
+        write_metrics()
+    else:
+        manifest = load_manifest() if args.incremental else None
+        if args.screenshots:
+            data = process_screenshots(args.screenshots, CROPPED_FOLDER if args.save_crops else None,
+                                       manifest=manifest, **pool_options)
+        else:
+            data = process_cropped_images(manifest=manifest, **pool_options)
+        saved = save_data(data, merge=args.incremental)
+        if manifest is not None and saved:
+            save_manifest(manifest)
+        log_counters()
+        write_metrics()
+        logging.info("Data extraction complete. Processed data saved to 'output/processed_inventory.csv'.")
 # -------------------------------------------------------
@@ -0,0 +1,49 @@
+import numpy as np
+
+# ------------------- Candidate Index -------------------
+# token_sort_ratio scores two strings as 100 * 2 * LCS / (len1 + len2) after sorting their
+# tokens. The longest common subsequence can never exceed the per-character overlap of the
+# two strings, so a character-count index gives an upper bound on the score of every catalog
+# name at once. Names whose bound is below the cutoff can't match and are never scored,
+# which keeps the results identical to scoring the whole catalog.
+
+
+def sort_tokens(text):
+    # The string token_sort_ratio actually compares
+    return " ".join(sorted(text.split()))
+
+
+def build_candidate_index(names):
+    """
+    Build a character-count matrix (one row per name) for bounding token_sort_ratio scores.
+    """
+    sorted_names = [sort_tokens(name) for name in names]
+    alphabet = {char: column for column, char in enumerate(sorted({char for name in sorted_names for char in name}))}
+    counts = np.zeros((len(names), len(alphabet)), dtype=np.uint16)
+    for row, name in enumerate(sorted_names):
+        for char in name:
+            counts[row, alphabet[char]] += 1
+    lengths = np.array([len(name) for name in sorted_names], dtype=np.int64)
+    return {'names': list(names), 'alphabet': alphabet, 'counts': counts, 'lengths': lengths}
+
+
+def candidate_names(index, query, score_cutoff):
+    """
+    Return, in catalog order, the names whose token_sort_ratio with query can reach score_cutoff.
+    """
+    sorted_query = sort_tokens(query)
+    query_counts = np.zeros(len(index['alphabet']), dtype=np.uint16)
+    for char in sorted_query:
+        column = index['alphabet'].get(char)
+        if column is not None:
+            query_counts[column] += 1
+
+    overlap = np.minimum(index['counts'], query_counts).sum(axis=1)
+    total_lengths = index['lengths'] + len(sorted_query)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bounds = np.where(total_lengths > 0, 200.0 * overlap / total_lengths, 100.0)
+
+    # Small tolerance so float rounding never drops a name the scorer would keep
+    names = index['names']
+    return [names[row] for row in np.flatnonzero(bounds >= score_cutoff - 1e-6)]
+# ---------------------------------------------------------
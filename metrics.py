@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+
+# ------------------- Configuration -------------------
+
+# Upper bounds (seconds) of the stage latency histogram buckets, as Prometheus 'le' labels
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of every exported Prometheus metric
+METRIC_PREFIX = 'inventory'
+
+# -----------------------------------------------------
+
+# Off by default: timer() then hands out a shared no-op context manager and the recording
+# functions return at once, so instrumented code pays one attribute check per call
+enabled = False
+
+_lock = threading.Lock()
+_histograms = {}    # stage -> [count per bucket..., count above the last bucket, sum of seconds]
+_counters = Counter()
+_gauges = {}        # name -> [last value, highest value]
+
+
+def enable(flag=True):
+    global enabled
+    enabled = flag
+
+
+def observe(stage, seconds):
+    if not enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        histogram[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+
+
+def increment(name, amount=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] += amount
+
+
+def set_gauge(name, value):
+    # Keeps the latest value and the highest seen, e.g. for queue depth
+    if not enabled:
+        return
+    with _lock:
+        gauge = _gauges.get(name)
+        if gauge is None:
+            _gauges[name] = [value, value]
+        else:
+            gauge[0] = value
+            gauge[1] = max(gauge[1], value)
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_timer = _NullTimer()
+
+
+def timer(stage):
+    """
+    Context manager recording the latency of its block under stage.
+    """
+    return _Timer(stage) if enabled else _null_timer
+
+
+def timed(stage):
+    """
+    Decorator recording the latency of every call under stage.
+    """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def drain():
+    """
+    Return everything recorded so far and reset it; worker processes send this back to the
+    parent, which merge()s it.
+    """
+    with _lock:
+        snapshot = {
+            'histograms': {stage: list(histogram) for stage, histogram in _histograms.items()},
+            'counters': dict(_counters),
+            'gauges': {name: list(gauge) for name, gauge in _gauges.items()},
+        }
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+    return snapshot
+
+
+def merge(snapshot):
+    with _lock:
+        for stage, histogram in snapshot['histograms'].items():
+            own = _histograms.setdefault(stage, [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+            for index, value in enumerate(histogram):
+                own[index] += value
+        _counters.update(snapshot['counters'])
+        for name, (last, highest) in snapshot['gauges'].items():
+            gauge = _gauges.setdefault(name, [last, highest])
+            gauge[0] = last
+            gauge[1] = max(gauge[1], highest)
+
+
+def summary(counters=None):
+    """
+    JSON-ready summary of the stage latencies, counters (plus any given) and gauges.
+    """
+    with _lock:
+        histograms = {stage: list(histogram) for stage, histogram in _histograms.items()}
+        all_counters = Counter(_counters)
+        gauges = {name: {'last': last, 'max': highest} for name, (last, highest) in _gauges.items()}
+    all_counters.update(counters or {})
+    stages = {}
+    for stage, histogram in sorted(histograms.items()):
+        count = sum(histogram[:-1])
+        stages[stage] = {
+            'count': count,
+            'total_seconds': histogram[-1],
+            'mean_ms': 1000 * histogram[-1] / count if count else 0.0,
+            'p50_ms': 1000 * _bucket_quantile(histogram, 0.5),
+            'p95_ms': 1000 * _bucket_quantile(histogram, 0.95),
+            'buckets': {str(bound): value for bound, value in zip(LATENCY_BUCKETS + ('+Inf',), histogram[:-1])},
+        }
+    return {'stages': stages, 'counters': dict(sorted(all_counters.items())), 'gauges': gauges}
+
+
+def _bucket_quantile(histogram, quantile):
+    # Upper bound of the bucket holding the quantile; the last finite bound for the overflow bucket
+    counts = histogram[:-1]
+    target = quantile * sum(counts)
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS + (LATENCY_BUCKETS[-1],), counts):
+        seen += count
+        if seen >= target and count:
+            return bound
+    return 0.0
+
+
+def prometheus_text(counters=None):
+    """
+    Render the metrics in the Prometheus text exposition format.
+    """
+    data = summary(counters)
+    lines = [f'# HELP {METRIC_PREFIX}_stage_seconds Latency of each pipeline stage.',
+             f'# TYPE {METRIC_PREFIX}_stage_seconds histogram']
+    for stage, stats in data['stages'].items():
+        cumulative = 0
+        for bound, count in stats['buckets'].items():
+            cumulative += count
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {stats["total_seconds"]}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    lines += [f'# HELP {METRIC_PREFIX}_events_total Run counters (cache hits, fallbacks, rejections, ...).',
+              f'# TYPE {METRIC_PREFIX}_events_total counter']
+    lines += [f'{METRIC_PREFIX}_events_total{{event="{name}"}} {value}' for name, value in data['counters'].items()]
+    for suffix, key, description in (('', 'last', 'Latest'), ('_max', 'max', 'Highest')):
+        lines += [f'# HELP {METRIC_PREFIX}_gauge{suffix} {description} value of each gauge (e.g. queue depth).',
+                  f'# TYPE {METRIC_PREFIX}_gauge{suffix} gauge']
+        lines += [f'{METRIC_PREFIX}_gauge{suffix}{{name="{name}"}} {values[key]}' for name, values in data['gauges'].items()]
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path, text):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_reports(folder, counters=None):
+    """
+    Write metrics.json and metrics.prom to folder. Returns their paths.
+    """
+    json_path = os.path.join(folder, 'metrics.json')
+    prometheus_path = os.path.join(folder, 'metrics.prom')
+    _write_atomic(json_path, json.dumps(summary(counters), indent=2))
+    _write_atomic(prometheus_path, prometheus_text(counters))
+    return json_path, prometheus_path
@@ -0,0 +1,103 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import sqlite_connections
+
+# ------------------- Configuration -------------------
+
+# Entries kept before the least recently used ones are evicted
+MAX_ENTRIES = 200000
+
+# Fraction of MAX_ENTRIES to keep after an eviction pass, so eviction does not run on every insert
+EVICT_TO = 0.9
+
+# Number of inserts on a connection between size checks
+EVICT_CHECK_INTERVAL = 500
+
+# -----------------------------------------------------
+
+# Inserts made by each thread, counted towards the next eviction check
+_local = threading.local()
+
+
+def hash_image(image):
+    """
+    Content hash of a crop's pixels, shape and dtype.
+    """
+    digest = hashlib.sha1()
+    digest.update(f"{image.shape}:{image.dtype}".encode())
+    digest.update(memoryview(image if image.flags['C_CONTIGUOUS'] else image.copy()))
+    return digest.hexdigest()
+
+
+def make_key(image_hash, engine, image_type, config):
+    """
+    Cache key for one engine's result on one crop under a given preprocessing/engine configuration.
+    """
+    return f"{image_hash}:{engine}:{image_type}:{config}"
+
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS ocr_results ("
+    " key TEXT PRIMARY KEY,"
+    " text TEXT NOT NULL,"
+    " confidence REAL NOT NULL,"
+    " last_used REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_ocr_results_last_used ON ocr_results (last_used)",
+]
+
+
+def _connect(path):
+    return sqlite_connections.connect(path, SCHEMA, isolation_level=None)
+
+
+def get(path, key):
+    """
+    Return the cached (text, confidence) for a key, or None on a miss.
+    """
+    try:
+        connection = _connect(path)
+        row = connection.execute("SELECT text, confidence FROM ocr_results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE ocr_results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0], row[1]
+    except sqlite3.Error as e:
+        logging.error(f"OCR cache lookup failed: {e}")
+        return None
+
+
+def put(path, key, text, confidence):
+    """
+    Store an OCR result, evicting the least recently used entries when the cache is full.
+    """
+    try:
+        connection = _connect(path)
+        connection.execute(
+            "INSERT OR REPLACE INTO ocr_results (key, text, confidence, last_used) VALUES (?, ?, ?, ?)",
+            (key, text, float(confidence), time.time())
+        )
+        _local.inserts = getattr(_local, 'inserts', 0) + 1
+        if _local.inserts % EVICT_CHECK_INTERVAL == 0:
+            evict(path)
+    except sqlite3.Error as e:
+        logging.error(f"OCR cache insert failed: {e}")
+
+
+def evict(path, max_entries=None):
+    """
+    Trim the cache to EVICT_TO * max_entries once it grows past max_entries.
+    """
+    max_entries = max_entries or MAX_ENTRIES
+    connection = _connect(path)
+    (count,) = connection.execute("SELECT COUNT(*) FROM ocr_results").fetchone()
+    if count <= max_entries:
+        return
+    excess = count - int(max_entries * EVICT_TO)
+    connection.execute(
+        "DELETE FROM ocr_results WHERE key IN (SELECT key FROM ocr_results ORDER BY last_used LIMIT ?)",
+        (excess,)
+    )
+    logging.info(f"Evicted {excess} entries from the OCR cache at {path}")
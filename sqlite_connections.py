@@ -0,0 +1,33 @@
+import os
+import sqlite3
+import threading
+
+# ------------------- SQLite Connections -------------------
+# SQLite connections can't be shared between threads, so each thread keeps its own per
+# database file. Stores open them through connect() with their schema.
+
+_local = threading.local()
+
+
+def connect(path, schema=(), isolation_level=''):
+    """
+    Return this thread's connection to the SQLite file at path, opening it in WAL mode and
+    running the schema statements on first use. isolation_level is passed to sqlite3.connect
+    (None for autocommit).
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = sqlite3.connect(path, timeout=30, isolation_level=isolation_level)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in schema:
+            connection.execute(statement)
+        connection.commit()
+        connections[path] = connection
+    return connection
+# ---------------------------------------------------------
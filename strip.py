@@ -1,93 +1,135 @@
-from bs4 import BeautifulSoup
+import argparse
 import csv
+import os
+from lxml import etree
+import item_categories
 
-# Load HTML content from source.html
-with open("source.html", "r", encoding="utf-8") as file:
-    html_content = file.read()
-
-# Parse the HTML content
-soup = BeautifulSoup(html_content, "html.parser")
-
-# Define lists to store weapon, armor, and accessory details
-weapons = []
-armors = []
-accessories = []
-
-# Iterate over each row in the table
-for row in soup.find_all("tr"):
-    # Initialize variables
-    item_name = None
-    item_type = None
-    item_type_text = None  # New variable to store the item type text
-    rarity = None  # New variable for rarity
-
-    # Extract the name and rarity
-    name_cell = row.find_all("td", class_="center")
-    if name_cell:
-        # The first <td> contains the item name with <a> tag
-        name_tag = name_cell[0].find("a", class_="a-link")
-        if name_tag:
-            item_name = name_tag.get_text(strip=True)
+# Pages of the item database to extract from
+SOURCE_FILES = ["source.html"]
+
+# Catalog file written for each category
+CATALOG_FILES = {
+    "Weapon": "weapons.csv",
+    "Armor": "armor.csv",
+    "Accessory": "accessories.csv",
+}
+
+
+def has_class(element, class_name):
+    return class_name in (element.get("class") or "").split()
+
+
+def text_of(element):
+    # Every text fragment stripped and joined, as BeautifulSoup's get_text(strip=True) does
+    return "".join(fragment.strip() for fragment in element.itertext())
+
+
+def parse_row(row):
+    """
+    Return (category, [name, type text, rarity]) for an item table row, or None if the row
+    isn't a classifiable item.
+    """
+    name_cell = [cell for cell in row.iter("td") if has_class(cell, "center")]
+    if len(name_cell) < 2:
+        return None
+
+    # The first <td> contains the item name with <a> tag; if no <a> tag, extract text directly
+    name_tag = next((tag for tag in name_cell[0].iter("a") if has_class(tag, "a-link")), None)
+    item_name = text_of(name_tag if name_tag is not None else name_cell[0])
+
+    # The second <td> contains the item type, classified by its keywords
+    item_type_text = text_of(name_cell[1])
+    item_type = item_categories.classify(item_type_text)
+
+    # The third <td> contains the rarity, within a <span> with class 'a-red' or directly as text
+    rarity = ""
+    if len(name_cell) > 2:
+        span_tag = next((tag for tag in name_cell[2].iter("span") if has_class(tag, "a-red")), None)
+        if span_tag is not None:
+            rarity_text = text_of(span_tag)
+            rarity = rarity_text if rarity_text.lower() != "none" else "Unknown"
         else:
-            # If no <a> tag, extract text directly
-            item_name = name_cell[0].get_text(strip=True)
-        
-        # The third <td> contains the rarity
-        if len(name_cell) > 2:
-            rarity_cell = name_cell[2]
-            # Check if rarity is within a <span> with class 'a-red' or directly as text
-            span_tag = rarity_cell.find("span", class_="a-red")
-            if span_tag:
-                rarity_text = span_tag.get_text(strip=True)
-                rarity = rarity_text if rarity_text.lower() != "none" else "Unknown"
-            else:
-                rarity = rarity_cell.get_text(strip=True).strip()
-
-    # Extract the item type from the second <td>
-    if name_cell and len(name_cell) > 1:
-        item_type_text = name_cell[1].get_text(strip=True)
-        # Debug print
-        # print(f"Item Name: {item_name}, Item Type Text: {item_type_text}, Rarity: {rarity}")
-        # Convert item_type_text to lowercase for case-insensitive comparison
-        item_type_text_lower = item_type_text.lower()
-        # Classify based on item type keywords
-        if any(keyword.lower() in item_type_text_lower for keyword in ["Dagger", "Staff", "Bow", "Sword", "Wand", "Crossbow", "Greatsword"]):
-            item_type = "Weapon"
-        elif any(keyword.lower() in item_type_text_lower for keyword in ["Armor", "Helmet", "Shield", "Chest", "Boots", "Head", "Legs", "Feet", "Hands", "Cloak", "Gloves", "Pants", "Robes", "Tunic", "Greaves", "Gauntlets", "Plate", "Mail", "Mask", "Vestment", "Hat", "Shoes", "Cap", "Mantle", "Visor", "Circlet", "Hood", "Sabatons"]):
-            item_type = "Armor"
-        elif any(keyword.lower() in item_type_text_lower for keyword in ["Belt", "Ring", "Bracelet", "Necklace", "Earring", "Amulet", "Pendant", "Charm", "Wristlet", "Bangle", "Collar", "Choker", "Torque"]):
-            item_type = "Accessory"
-
-    # Classify and store the item with rarity and type
-    if item_name and item_type and item_type_text:
-        item_details = {
-            "Name": item_name,
-            "Type": item_type_text,  # Include the item type text
-            "Rarity": rarity
-        }
-        if item_type == "Weapon":
-            weapons.append(item_details)
-        elif item_type == "Armor":
-            armors.append(item_details)
-        elif item_type == "Accessory":
-            accessories.append(item_details)
-
-# Function to save items to CSV
+            rarity = text_of(name_cell[2])
+
+    if not (item_name and item_type and item_type_text):
+        return None
+    return item_type, [item_name, item_type_text, rarity]
+
+
+def iter_items(source_file):
+    """
+    Stream the classified items of one page. Rows are parsed as they are read and
+    discarded once handled, so memory doesn't grow with the page.
+    """
+    for _, row in etree.iterparse(source_file, events=("end",), tag="tr", html=True, recover=True):
+        item = parse_row(row)
+        if item is not None:
+            yield item
+        row.clear(keep_tail=True)
+        while row.getprevious() is not None:
+            del row.getparent()[0]
+
+
+def load_catalog(file_name):
+    # Existing catalog rows keyed by item name, in file order
+    catalog = {}
+    if not os.path.exists(file_name):
+        return catalog
+    with open(file_name, "r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if row:
+                catalog[row[0]] = (row + ["", ""])[:3]
+    return catalog
+
+
 def save_items_to_csv(items, file_name, item_type):
-    with open(file_name, "w", newline='', encoding="utf-8") as file:
+    tmp_path = file_name + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as file:
         writer = csv.writer(file)
         header = [f"{item_type} Name", "Type", "Rarity"]
         writer.writerow(header)
-        for item in items:
-            writer.writerow([item["Name"], item["Type"], item["Rarity"]])
+        writer.writerows(items)
+    os.replace(tmp_path, file_name)
+
+
+def extract(source_files):
+    """
+    Merge the items of every source page into the catalog files. Only added or changed rows
+    are printed, and only catalogs with changes are rewritten; rows missing from the
+    sources are kept, so a page covering part of the database can be extracted on its own.
+    """
+    # An item listed more than once keeps its last row, as main.py does when loading the catalogs
+    extracted = {category: {} for category in CATALOG_FILES}
+    for source_file in source_files:
+        for category, row in iter_items(source_file):
+            extracted[category][row[0]] = row
+
+    catalogs = {category: load_catalog(file_name) for category, file_name in CATALOG_FILES.items()}
+    changed = {category: 0 for category in CATALOG_FILES}
+    for category, rows in extracted.items():
+        catalog = catalogs[category]
+        for name, row in rows.items():
+            previous = catalog.get(name)
+            if previous == row:
+                continue
+            catalog[name] = row
+            changed[category] += 1
+            print(f"{'Changed' if previous else 'Added'} {category}: {', '.join(row)}")
+
+    for category, file_name in CATALOG_FILES.items():
+        if changed[category]:
+            save_items_to_csv(catalogs[category].values(), file_name, category)
+    summary = ", ".join(f"{count} in {CATALOG_FILES[category]}" for category, count in changed.items())
+    print(f"Extraction complete. Added or changed rows: {summary}.")
 
-# Save weapons to weapons.csv
-save_items_to_csv(weapons, "weapons.csv", "Weapon")
 
-# Save armors to armor.csv
-save_items_to_csv(armors, "armor.csv", "Armor")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract the item catalogs from item database pages.")
+    parser.add_argument("sources", nargs="*", default=SOURCE_FILES, help="HTML pages to extract from")
+    return parser.parse_args()
 
-# Save accessories to accessories.csv
-save_items_to_csv(accessories, "accessories.csv", "Accessory")
 
-print("Extraction complete. Data saved to weapons.csv, armor.csv, and accessories.csv.")
+if __name__ == "__main__":
+    extract(parse_args().sources)
@@ -0,0 +1,36 @@
+import numpy as np
+import benchmark
+import capture
+import crop_screenshot
+
+
+def render(item_name, trait, seed, noise=8):
+    font = benchmark.load_font(None, 1.0)
+    title_template, trait_template = benchmark.load_color_templates()
+    return benchmark.render_tooltip(item_name, trait, font, title_template, trait_template,
+                                    np.random.default_rng(seed), noise, title_color=(163, 53, 238))
+
+
+def make_filter():
+    return capture.DuplicateFilter(*crop_screenshot.load_templates())
+
+
+def test_same_tooltip_is_dropped_wherever_it_appears():
+    duplicate_filter = make_filter()
+    assert not duplicate_filter.should_drop(render('Heroic Blade of the Resistance', 'Attack Speed', seed=1))
+    assert duplicate_filter.should_drop(render('Heroic Blade of the Resistance', 'Attack Speed', seed=2))
+
+
+def test_different_titles_under_the_same_trait_are_kept():
+    duplicate_filter = make_filter()
+    for item_name in ('Heroic Blade of the Resistance', 'Heroic Boots of the Resistance',
+                      'Heroic Robes of the Resistance', 'Heroic Shoes of the Resistance'):
+        assert not duplicate_filter.should_drop(render(item_name, 'Attack Speed', seed=1))
+
+
+def test_frame_without_tooltip_resets_the_filter():
+    duplicate_filter = make_filter()
+    blank = np.zeros((benchmark.SCREENSHOT_HEIGHT, benchmark.SCREENSHOT_WIDTH, 3), np.uint8)
+    assert not duplicate_filter.should_drop(render('Acolyte Hood', 'Attack Speed', seed=1))
+    assert duplicate_filter.should_drop(blank)
+    assert not duplicate_filter.should_drop(render('Acolyte Hood', 'Attack Speed', seed=1))
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import benchmark
+import crop_screenshot
+import fingerprint_index
+
+
+def fingerprint(item_name, seed, noise=8):
+    font = benchmark.load_font(None, 0.9)
+    title_template, trait_template = benchmark.load_color_templates()
+    screenshot = benchmark.render_tooltip(item_name, '', font, title_template, trait_template,
+                                          np.random.default_rng(seed), noise, title_color=(0, 112, 221))
+    return benchmark.title_fingerprint(screenshot, crop_screenshot.load_templates())
+
+
+@pytest.fixture
+def index(tmp_path):
+    return fingerprint_index.FingerprintIndex(str(tmp_path / 'fingerprints.sqlite'))
+
+
+@pytest.mark.parametrize('stored, unseen', [
+    ('Robes of the Resistance', 'Shoes of the Resistance'),
+    ('Heroic Boots of the Resistance', 'Heroic Blade of the Resistance'),
+    ('Visor of the Infernal Herald', 'Plate of the Infernal Herald'),
+])
+def test_unseen_item_does_not_match_a_similar_stored_name(index, stored, unseen):
+    index.add('title', fingerprint(stored, seed=0, noise=0), stored)
+    for seed in range(1, 4):
+        assert index.lookup('title', fingerprint(unseen, seed)) is None
+
+
+def test_noisy_crops_of_a_stored_item_are_recognized(index):
+    index.add('title', fingerprint('Heroic Boots of the Resistance', seed=0, noise=0), 'Heroic Boots of the Resistance')
+    names = [index.lookup('title', fingerprint('Heroic Boots of the Resistance', seed)) for seed in range(1, 6)]
+    assert names == ['Heroic Boots of the Resistance'] * 5
+
+
+def test_fingerprints_of_an_older_hash_version_are_discarded(tmp_path):
+    path = str(tmp_path / 'fingerprints.sqlite')
+    fingerprint_index.FingerprintIndex(path).add('title', 12345, 'Acolyte Hood')
+    index = fingerprint_index.FingerprintIndex(path)
+    assert index.lookup('title', 12345) == 'Acolyte Hood'
+    index._connection.execute("PRAGMA user_version = 1")
+    index._connection.commit()
+    assert fingerprint_index.FingerprintIndex(path).lookup('title', 12345) is None
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import benchmark
+import crop_screenshot
+import main
+import title_templates
+
+# Catalog names that differ in a single word
+NEAR_IDENTICAL_NAMES = [
+    'Shock Commander Plate Armor', 'Shock Commander Gauntlets',
+    'Decorated Champion Gauntlets', 'Decorated Champion Greaves',
+    'Sabatons of the Field General', 'Gauntlets of the Field General',
+    'Heroic Blade of the Resistance', 'Heroic Boots of the Resistance',
+]
+
+
+@pytest.fixture(scope='module')
+def templates():
+    main.ensure_catalogs()
+    return title_templates.TitleTemplates(list(dict.fromkeys(main.item_names)))
+
+
+def title_crop(item_name, scale, seed, noise=8):
+    font = benchmark.load_font(None, scale)
+    title_template, trait_template = benchmark.load_color_templates()
+    screenshot = benchmark.render_tooltip(item_name, 'Attack Speed', font, title_template, trait_template,
+                                          np.random.default_rng(seed), noise)
+    crops = crop_screenshot.crop_image(screenshot, *crop_screenshot.load_templates(), log_rejections=False)
+    return main.preprocess_image(crops[0])
+
+
+@pytest.mark.parametrize('item_name', NEAR_IDENTICAL_NAMES)
+@pytest.mark.parametrize('scale', [0.8, 1.0])
+def test_near_identical_names_are_never_confused(templates, item_name, scale):
+    for seed in range(5):
+        name, score = templates.recognize(title_crop(item_name, scale, seed))
+        assert name in (item_name, None), f"'{item_name}' recognized as '{name}' ({score:.3f})"
+
+
+def test_fitting_titles_are_recognized_unless_too_close(templates):
+    recognized = [templates.recognize(title_crop(item_name, 0.8, seed=0))[0] for item_name in NEAR_IDENTICAL_NAMES]
+    # "Heroic Blade" and "Heroic Boots" don't clear MIN_MARGIN against each other and go to OCR
+    assert recognized == NEAR_IDENTICAL_NAMES[:6] + [None, None]
+
+
+def test_cut_off_title_goes_to_ocr(templates):
+    # At full size the name is wider than the title crop and ends at its right edge
+    binary = title_crop('Decorated Champion Gauntlets', 1.0, seed=0, noise=0)
+    assert title_templates.is_clipped(binary)
+    assert templates.recognize(binary) == (None, 0.0)
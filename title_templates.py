@@ -0,0 +1,172 @@
+import logging
+import threading
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# ------------------- Configuration -------------------
+
+# Fonts tried, in order, to render the catalog names. Put the game's title font first
+# for the best scores; PIL also searches the system font folders for bare file names.
+TITLE_FONT_PATHS = [
+    "arialbd.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+]
+RENDER_FONT_SIZE = 48
+
+# Every title line is trimmed to its ink, stretched to this size and slightly blurred, so
+# differences in font size and letter spacing don't break the correlation
+TEMPLATE_HEIGHT = 16
+TEMPLATE_WIDTH = 128
+TEMPLATE_BLUR = 1.0
+
+# Stretching hides the title's length, so the score is reduced by this much per unit of
+# log difference between the crop's and the template's aspect ratios
+ASPECT_PENALTY = 0.5
+
+# A title line with ink within this many columns of the crop's left or right edge may be
+# cut off ("Decorated Champion Gaunt..." scores well against "... Greaves"), so it goes to OCR
+EDGE_COLUMNS = 2
+
+# A crop is recognized when its best correlation reaches MIN_SCORE and beats the best
+# different name by MIN_MARGIN; anything less goes to OCR. At 0.80 / 0.03, titles cut off at a
+# word gap still matched a sibling ("Shock Commander Plate Armor" as "Shock Commander
+# Gauntlets" at 0.807); these values had no wrong hits on 3000 rendered, noisy tooltips
+MIN_SCORE = 0.85
+MIN_MARGIN = 0.05
+
+# Confirmed crops added as extra templates per name during a run
+MAX_LEARNED_PER_NAME = 3
+
+# -----------------------------------------------------
+
+
+def load_font():
+    for font_path in TITLE_FONT_PATHS:
+        try:
+            return ImageFont.truetype(font_path, RENDER_FONT_SIZE)
+        except OSError:
+            continue
+    logging.warning("No title font found, rendering title templates with PIL's default font.")
+    return ImageFont.load_default(RENDER_FONT_SIZE)
+
+
+def text_ink(binary):
+    # Text is the minority class, whatever polarity the crop was thresholded to
+    ink = binary > 127
+    return ~ink if ink.mean() > 0.5 else ink
+
+
+def title_line(ink):
+    # The densest band of rows, which is the title line
+    rows = np.flatnonzero(ink.any(axis=1))
+    bands = np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1)
+    band = max(bands, key=lambda band_rows: ink[band_rows].sum())
+    return ink[band[0]:band[-1] + 1]
+
+
+def is_clipped(binary):
+    """
+    True when the title line runs into the left or right edge of the crop, so part of the
+    name may be cut off and a shorter name could match it as well as the real one.
+    """
+    ink = text_ink(binary)
+    if not ink.any():
+        return False
+    line = title_line(ink)
+    return bool(line[:, :EDGE_COLUMNS].any() or line[:, -EDGE_COLUMNS:].any())
+
+
+def normalize_glyphs(binary):
+    """
+    Turn a binarized title image into a zero-mean, unit-length vector that can be compared
+    with other titles by a dot product, plus the log aspect ratio of its text line.
+    Returns (None, None) when there is no text.
+    """
+    ink = text_ink(binary)
+    if not ink.any():
+        return None, None
+
+    # Keep the title line, trimmed to its ink
+    line = title_line(ink)
+    columns = np.flatnonzero(line.any(axis=0))
+    line = line[:, columns[0]:columns[-1] + 1].astype(np.float32)
+
+    height, width = line.shape
+    canvas = cv2.resize(line, (TEMPLATE_WIDTH, TEMPLATE_HEIGHT), interpolation=cv2.INTER_AREA)
+    canvas = cv2.GaussianBlur(canvas, (0, 0), TEMPLATE_BLUR)
+
+    vector = canvas.ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return None, None
+    return vector / norm, np.log(width / height)
+
+
+def render_name(name, font):
+    """
+    Render a catalog name as white text on black and binarize it.
+    """
+    left, top, right, bottom = font.getbbox(name)
+    image = Image.new("L", (right - left + 20, bottom - top + 20), 0)
+    ImageDraw.Draw(image).text((10 - left, 10 - top), name, fill=255, font=font)
+    return (np.asarray(image) > 127).astype(np.uint8) * 255
+
+
+class TitleTemplates:
+    """
+    Binarized word templates for every catalog name, scored against a title crop with one
+    matrix-vector product.
+    """
+
+    def __init__(self, names):
+        font = load_font()
+        self._lock = threading.Lock()
+        self._learned = {}
+        template_names, vectors, aspects = [], [], []
+        for name in names:
+            vector, aspect = normalize_glyphs(render_name(name, font))
+            if vector is not None:
+                template_names.append(name)
+                vectors.append(vector)
+                aspects.append(aspect)
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, TEMPLATE_HEIGHT * TEMPLATE_WIDTH), np.float32)
+        self._name_ids = {name: index for index, name in enumerate(dict.fromkeys(template_names))}
+        # (names, name ids, matrix, aspects) is swapped as a whole so readers never see a half-updated set
+        self._templates = (template_names, np.array([self._name_ids[name] for name in template_names], dtype=np.int64),
+                           matrix, np.array(aspects, dtype=np.float32))
+        logging.info(f"Rendered {len(template_names)} title templates.")
+
+    def recognize(self, binary):
+        """
+        Return (name, score) for a preprocessed title crop, or (None, score) when the match is too weak.
+        """
+        names, name_ids, matrix, aspects = self._templates
+        vector, aspect = normalize_glyphs(binary)
+        if vector is None or not names or is_clipped(binary):
+            return None, 0.0
+        scores = matrix @ vector - ASPECT_PENALTY * np.abs(aspects - aspect)
+        best = int(scores.argmax())
+        best_score = float(scores[best])
+        other_scores = scores[name_ids != name_ids[best]]
+        runner_up = float(other_scores.max()) if other_scores.size else -1.0
+        if best_score >= MIN_SCORE and best_score - runner_up >= MIN_MARGIN:
+            return names[best], best_score
+        return None, best_score
+
+    def learn(self, name, binary):
+        """
+        Add a confirmed crop as an extra template for name, so the real game font is picked up over a run.
+        """
+        with self._lock:
+            if self._learned.get(name, 0) >= MAX_LEARNED_PER_NAME or is_clipped(binary):
+                return
+            vector, aspect = normalize_glyphs(binary)
+            if vector is None:
+                return
+            self._learned[name] = self._learned.get(name, 0) + 1
+            name_id = self._name_ids.setdefault(name, len(self._name_ids))
+            names, name_ids, matrix, aspects = self._templates
+            self._templates = (names + [name], np.append(name_ids, name_id),
+                               np.vstack([matrix, vector]), np.append(aspects, aspect))